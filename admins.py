@@ -0,0 +1,58 @@
+import time
+from telegram import ChatMember
+
+ADMIN_STATUSES = (ChatMember.ADMINISTRATOR, ChatMember.OWNER)
+
+
+class AdminCache:
+    """Per-chat administrator id sets cached in-process and in Redis
+
+    Lookups hit the local copy first, then the Redis set shared by every
+    worker, and only then ``getChatAdministrators``. Entries expire after
+    their TTL and are dropped when a chat_member update touches an admin.
+    """
+
+    def __init__(self, storage, ttl=600, local_ttl=60):
+        self.storage = storage
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self._local = {}  # chat_id -> (expires_at, frozenset of user ids)
+
+    @staticmethod
+    def _key(chat_id):
+        return f"admins:{chat_id}"
+
+    async def admins(self, bot, chat_id):
+        now = time.monotonic()
+        cached = self._local.get(chat_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        members = await self.storage.client.smembers(self._key(chat_id))
+        if members:
+            admins = frozenset(int(m) for m in members)
+        else:
+            admins = frozenset(
+                member.user.id for member in await bot.get_chat_administrators(chat_id)
+            )
+            async with self.storage.client.pipeline(transaction=True) as pipe:
+                pipe.delete(self._key(chat_id))
+                pipe.sadd(self._key(chat_id), *admins)
+                pipe.expire(self._key(chat_id), self.ttl)
+                await pipe.execute()
+        self._local[chat_id] = (now + self.local_ttl, admins)
+        return admins
+
+    async def is_admin(self, bot, chat_id, user_id):
+        return user_id in await self.admins(bot, chat_id)
+
+    async def invalidate(self, chat_id):
+        self._local.pop(chat_id, None)
+        await self.storage.client.delete(self._key(chat_id))
+
+    async def on_member_update(self, chat_member_updated):
+        """Drop the cached list when someone gains or loses admin rights"""
+        old = chat_member_updated.old_chat_member.status in ADMIN_STATUSES
+        new = chat_member_updated.new_chat_member.status in ADMIN_STATUSES
+        if old or new:
+            await self.invalidate(chat_member_updated.chat.id)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Benchmark the homework listing queries on a large synthetic table
+
+Usage: python benchmarks/homework_queries.py [rows]
+
+Builds a temporary database with the real migrations, fills it with
+``rows`` homework items (default 1,000,000) spread over many chats, checks
+that the query planner uses the homework indexes, and reports per-query
+latency. Exits non-zero if a query averages 1 ms or more.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import migrate  # noqa: E402
+from homework import BY_SUBJECT_SQL, UPCOMING_SQL  # noqa: E402
+
+SUBJECTS = ["Math", "Physics", "Chemistry", "Biology", "English", "History", "Geography", "ICT"]
+CHATS = 2000
+RUNS = 2000
+
+
+def populate(conn, rows):
+    start = 1_700_000_000
+    rng = random.Random(42)
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO homework (chat_id, subject, description, due_date, due_at, added_by) "
+        "VALUES (?, ?, ?, '', ?, 0)",
+        (
+            (
+                -1000000000000 - rng.randrange(CHATS),
+                rng.choice(SUBJECTS),
+                f"Exercise set {i}",
+                start + rng.randrange(365 * 86400),
+            )
+            for i in range(rows)
+        ),
+    )
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+
+
+def bench(conn, name, sql, make_params):
+    plan = " / ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, make_params()))
+    rng_params = [make_params() for _ in range(RUNS)]
+    started = time.perf_counter()
+    for params in rng_params:
+        conn.execute(sql, params).fetchall()
+    avg_ms = (time.perf_counter() - started) / RUNS * 1000
+    print(f"{name:<12} {avg_ms:8.4f} ms/query   plan: {plan}")
+    return avg_ms, plan
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"), isolation_level=None)
+        migrate(conn)
+        started = time.perf_counter()
+        populate(conn, rows)
+        print(f"inserted {rows} rows in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(7)
+        since = 1_700_000_000 + 180 * 86400
+
+        def chat():
+            return -1000000000000 - rng.randrange(CHATS)
+
+        results = [
+            bench(conn, "upcoming", UPCOMING_SQL, lambda: (chat(), since, 10)),
+            bench(conn, "by_subject", BY_SUBJECT_SQL,
+                  lambda: (chat(), rng.choice(SUBJECTS), since, 10)),
+        ]
+        conn.close()
+
+    failed = False
+    for avg_ms, plan in results:
+        if "USING INDEX idx_homework_" not in plan or "TEMP B-TREE" in plan:
+            print("query does not use the expected index without sorting")
+            failed = True
+        if avg_ms >= 1.0:
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Compare the Redis memory used by both warning layouts
+
+Usage: python benchmarks/warning_memory.py REDIS_URL [chats] [users_per_chat]
+
+Fills an EMPTY Redis database with the same warnings (1-2 per user, default
+1,000 chats of 50 users) in the ``keys`` and then the ``hash`` layout,
+reports ``used_memory`` growth and bytes per warned user for each, and
+flushes the database again. Refuses to touch a database holding data.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from storage import RedisStorage  # noqa: E402
+from warns import HashLayout, KeyLayout  # noqa: E402
+
+DECAY = 30 * 86400
+
+
+async def used_memory(client):
+    return (await client.info("memory"))["used_memory"]
+
+
+async def fill(client, layout, chats, users):
+    now = int(time.time())
+    for chat in range(chats):
+        chat_id = -1000000000000 - chat
+        async with client.pipeline(transaction=False) as pipe:
+            for user in range(users):
+                user_id = 100000000 + chat * users + user
+                stamps = [now - 3600 * i for i in range(1 + user % 2)]
+                if layout == "keys":
+                    key = KeyLayout.key(chat_id, user_id)
+                    pipe.zadd(key, {f"{ts * 1000}:{i:08x}": ts * 1000 for i, ts in enumerate(stamps)})
+                    pipe.pexpireat(key, (now + DECAY) * 1000)
+                else:
+                    pipe.hset(HashLayout.key(chat_id), user_id, ",".join(map(str, sorted(stamps))))
+            if layout == "hash":
+                pipe.expire(HashLayout.key(chat_id), DECAY)
+            await pipe.execute()
+
+
+async def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    users = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    storage = RedisStorage(sys.argv[1])
+    await storage.open()
+    client = storage.client
+    try:
+        if await client.dbsize():
+            sys.exit("refusing to run against a non-empty database")
+        for layout in ("keys", "hash"):
+            before = await used_memory(client)
+            await fill(client, layout, chats, users)
+            used = await used_memory(client) - before
+            sample = await client.randomkey()
+            encoding = (await client.object("encoding", sample)).decode()
+            print(
+                f"{layout:>5}: {used / 1024 / 1024:8.2f} MiB, "
+                f"{used / (chats * users):6.1f} B/user, {await client.dbsize()} keys ({encoding})"
+            )
+            await client.flushdb()
+    finally:
+        await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,30 +1,170 @@
 #!/usr/bin/env python3
+import asyncio
+import html
 import logging
-from telegram import Update, ChatPermissions
+import signal
+from datetime import datetime, timedelta, timezone
+from telegram import Bot, Update, ChatPermissions, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import mention_html
 from telegram.ext import (
     Application,
+    ApplicationHandlerStop,
+    CallbackQueryHandler,
+    ChatMemberHandler,
     CommandHandler,
     MessageHandler,
     ContextTypes,
+    TypeHandler,
     filters
 )
-import redis
+from admins import AdminCache
 from config import Config
+from database import Database, parse_due_date
+from flood import LocalFloodDetector, RedisFloodDetector
+from homework import HomeworkRepository
+from leaderboard import Leaderboard
+from logs import setup_logging, stop_logging
+from media import MediaCache
+from metrics import CountersCollector, MetricsServer, instrument_application
+from phrases import PhraseStore
+from processor import ChatOrderedUpdateProcessor
+from raid import RaidDetector
+from ratelimit import OutboundRateLimiter, Priority
+from reminders import ReminderScheduler
+from rules import RulesStore, render_rules
+from sharding import PollingIngress, QueueIngress, ShardSupervisor
+from storage import RedisStorage
+from users import UserUpsertPipeline
+from warns import WarningStore
+from webhook import WebhookServer
+from welcome import MAX_CAPTION_LENGTH, MAX_MESSAGE_LENGTH, WelcomeCoalescer
 
-# Initialize logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
-# Redis Connection
-redis_conn = redis.from_url(Config.REDIS_URL)
+DEFAULT_RULES_HTML = render_rules(Config.DEFAULT_RULES)
 
 class GroupManager:
-    def __init__(self):
-        self.app = Application.builder().token(Config.TOKEN).build()
+    def __init__(self, shard=0):
+        # Jobs not tied to one chat run only on the first shard
+        self.shard = shard
+        self.storage = RedisStorage(
+            Config.REDIS_URL,
+            max_connections=Config.REDIS_MAX_CONNECTIONS,
+            pool_timeout=Config.REDIS_POOL_TIMEOUT,
+            socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        )
+        self.db = Database(Config.DATABASE_PATH, readers=Config.DATABASE_READERS)
+        self.homework = HomeworkRepository(self.db)
+        self.warnings = WarningStore(
+            self.storage,
+            self.db,
+            Config.MAX_WARNINGS,
+            decay=Config.WARN_DECAY_DAYS * 86400,
+            layout=Config.WARN_LAYOUT,
+            flush_interval=Config.WARN_CHECKPOINT_MS / 1000,
+        )
+        self.users = UserUpsertPipeline(
+            self.db,
+            flush_interval=Config.USER_FLUSH_MS / 1000,
+            flush_max=Config.USER_FLUSH_MAX,
+        )
+        self.leaderboard = Leaderboard(
+            self.storage,
+            self.db,
+            flush_interval=Config.SCORE_FLUSH_MS / 1000,
+            flush_max=Config.SCORE_FLUSH_MAX,
+        )
+        self.admins = AdminCache(
+            self.storage, ttl=Config.ADMIN_CACHE_TTL, local_ttl=Config.ADMIN_CACHE_LOCAL_TTL
+        )
+        self.phrases = PhraseStore(self.storage, max_chats=Config.PHRASE_CACHE_CHATS)
+        if Config.FLOOD_BACKEND == "redis":
+            self.flood = RedisFloodDetector(self.storage, Config.FLOOD_LIMIT, Config.FLOOD_WINDOW)
+        else:
+            self.flood = LocalFloodDetector(Config.FLOOD_LIMIT, Config.FLOOD_WINDOW)
+        self.media = MediaCache(self.storage)
+        self.rules = RulesStore(self.storage, max_chats=Config.RULES_CACHE_CHATS)
+        self.welcomes = WelcomeCoalescer(
+            self._send_welcome,
+            self._delete_welcome,
+            window=Config.WELCOME_WINDOW,
+            max_mentions=Config.WELCOME_MAX_MENTIONS,
+            replace_previous=Config.WELCOME_REPLACE_PREVIOUS,
+            max_length=MAX_CAPTION_LENGTH if Config.WELCOME_PHOTO else MAX_MESSAGE_LENGTH,
+        )
+        self.raids = RaidDetector(Config.RAID_JOIN_THRESHOLD, Config.RAID_WINDOW, Config.RAID_COOLDOWN)
+        self.app = (
+            Application.builder()
+            .token(Config.TOKEN)
+            .concurrent_updates(ChatOrderedUpdateProcessor(
+                Config.CONCURRENT_UPDATES,
+                max_pending_updates=Config.MAX_PENDING_UPDATES,
+            ))
+            .rate_limiter(OutboundRateLimiter(
+                # Global limits are per bot, so shard workers split them
+                global_rate=Config.RATE_LIMIT_GLOBAL / Config.WORKERS,
+                group_per_minute=Config.RATE_LIMIT_GROUP_PER_MINUTE,
+                private_rate=Config.RATE_LIMIT_PRIVATE,
+                moderation_rate=Config.RATE_LIMIT_MODERATION / Config.WORKERS,
+                max_retries=Config.RATE_LIMIT_MAX_RETRIES,
+            ))
+            .post_init(self._post_init)
+            .post_stop(self._post_stop)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
+        self.metrics = None
+        if Config.METRICS_PORT:
+            self.metrics = MetricsServer(
+                Config.METRICS_LISTEN,
+                Config.METRICS_PORT + shard,
+                collectors=[CountersCollector(
+                    "bot_user_upserts", "Users seen, skipped as unchanged and written", self.users
+                )],
+            )
+        self.reminders = ReminderScheduler(
+            self.db,
+            self.app.job_queue,
+            self._send_reminder,
+            lead_time=Config.REMINDER_LEAD_HOURS * 3600,
+            resync=Config.REMINDER_RESYNC_SECONDS,
+        )
         self._register_handlers()
+
+    async def _post_init(self, application: Application):
+        """Open shared resources once the event loop is running"""
+        await self.storage.open()
+        await self.db.open()
+        await self.rules.start()
+        await self.leaderboard.start()
+        await self.users.start()
+        await self.warnings.start()
+        if self.metrics is not None:
+            await self.metrics.start()
+        if self.shard == 0:
+            await self.reminders.start()
+            application.job_queue.run_repeating(
+                self._reconcile_leaderboard,
+                interval=Config.LEADERBOARD_RECONCILE_SECONDS,
+                first=0,
+                name="leaderboard-reconcile",
+            )
+
+    async def _post_stop(self, application: Application):
+        """Flush buffered output while the bot can still send"""
+        await self.welcomes.close()
+        self.reminders.stop()
+
+    async def _post_shutdown(self, application: Application):
+        """Release shared resources"""
+        await self.rules.stop()
+        await self.leaderboard.close()
+        await self.users.close()
+        await self.warnings.close()
+        await self.db.close()
+        await self.storage.close()
+        if self.metrics is not None:
+            await self.metrics.stop()
     
     def _register_handlers(self):
         """Register command and message handlers"""
@@ -32,12 +172,49 @@ class GroupManager:
             CommandHandler("start", self._start),
             CommandHandler("help", self._help),
             CommandHandler("rules", self._show_rules),
+            CommandHandler("setrules", self._set_rules),
+            CommandHandler("warn", self._warn_user),
+            CommandHandler("warns", self._show_warnings),
+            CommandHandler("warnlist", self._list_warnings),
+            CommandHandler("homework", self._list_homework),
+            CommandHandler("addhomework", self._add_homework),
+            CommandHandler("hwsearch", self._search_homework),
+            CommandHandler("top", self._top_scores),
+            CommandHandler("rank", self._show_rank),
+            CommandHandler("addscore", self._add_score),
+            CallbackQueryHandler(self._page_homework_search, pattern=r"^hws:"),
+            CommandHandler("addphrase", self._add_phrase),
+            CommandHandler("delphrase", self._remove_phrase),
+            CommandHandler("phrases", self._list_phrases),
             MessageHandler(filters.TEXT & ~filters.COMMAND, self._handle_message),
             MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, self._welcome_new_members)
         ]
         
         for handler in handlers:
             self.app.add_handler(handler)
+
+        # Record every sender first, whatever later handlers decide
+        self.app.add_handler(TypeHandler(Update, self._track_user), group=-3)
+
+        # Admin-only commands are gated before any command handler runs
+        self.app.add_handler(
+            MessageHandler(filters.COMMAND, self._gate_admin_commands), group=-1
+        )
+        self.app.add_handler(
+            ChatMemberHandler(self._track_admins, ChatMemberHandler.CHAT_MEMBER), group=-1
+        )
+
+        # Flood control sees every message first, including gated commands
+        self.app.add_handler(
+            MessageHandler(
+                filters.ChatType.GROUPS & filters.UpdateType.MESSAGE & ~filters.StatusUpdate.ALL,
+                self._check_flood,
+            ),
+            group=-2,
+        )
+
+        # Every handler above reports latency, errors and concurrency
+        instrument_application(self.app)
     
     async def _start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Welcome message"""
@@ -46,6 +223,177 @@ class GroupManager:
             "Use /help for available commands."
         )
     
+    async def _help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """List available commands"""
+        await update.message.reply_text(
+            "📖 Commands:\n"
+            "/rules - show the group rules\n"
+            "/homework [subject] - upcoming homework\n"
+            "/hwsearch <words> - search homework\n"
+            "/top - leaderboard, /rank - your position\n"
+            "/warns - your warnings (or reply to check someone)\n"
+            "\n"
+            "Admins:\n"
+            "/warn - warn the user you reply to\n"
+            "/warnlist - everyone with live warnings\n"
+            "/setrules - replace the group rules\n"
+            "/addhomework <subject> <YYYY-MM-DD> <task> - add homework\n"
+            "/addscore <points> - award points to the user you reply to\n"
+            "/addphrase, /delphrase, /phrases - manage banned phrases"
+        )
+
+    async def _show_rules(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show the group rules"""
+        text = await self.rules.get(update.effective_chat.id) or DEFAULT_RULES_HTML
+        if Config.RULES_PHOTO and len(text) <= MAX_CAPTION_LENGTH:
+            await self.media.send_photo(
+                context.bot, update.effective_chat.id, Config.RULES_PHOTO,
+                caption=text,
+                parse_mode="HTML",
+                reply_to_message_id=update.effective_message.message_id,
+            )
+        else:
+            await update.message.reply_text(text, parse_mode="HTML")
+
+    async def _set_rules(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Replace the chat rules with the command text or the replied-to message"""
+        message = update.message
+        parts = message.text.split(maxsplit=1)
+        if len(parts) > 1:
+            text = parts[1]
+        elif message.reply_to_message and message.reply_to_message.text:
+            text = message.reply_to_message.text
+        else:
+            await message.reply_text("⚠️ Usage: /setrules <rules>, or reply to a message")
+            return
+        rendered = await self.rules.set(update.effective_chat.id, text)
+        await message.reply_text(f"✅ Rules updated\n\n{rendered}", parse_mode="HTML")
+
+    async def _list_homework(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """List upcoming homework, optionally for one subject"""
+        chat_id = update.effective_chat.id
+        if context.args:
+            rows = await self.homework.by_subject(chat_id, " ".join(context.args))
+        else:
+            rows = await self.homework.upcoming(chat_id)
+        if not rows:
+            await update.message.reply_text("📚 No upcoming homework")
+            return
+        lines = [
+            f"• <b>{html.escape(row['subject'])}</b> "
+            f"(due {datetime.fromtimestamp(row['due_at'], timezone.utc):%Y-%m-%d}): "
+            f"{html.escape(row['description'])}"
+            for row in rows
+        ]
+        await update.message.reply_text("📚 Upcoming homework:\n" + "\n".join(lines), parse_mode="HTML")
+
+    async def _add_homework(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Add homework: /addhomework <subject> <YYYY-MM-DD> <description>"""
+        due_at = parse_due_date(context.args[1]) if len(context.args) >= 3 else None
+        if due_at is None:
+            await update.message.reply_text("⚠️ Usage: /addhomework <subject> <YYYY-MM-DD> <description>")
+            return
+        subject, description = context.args[0], " ".join(context.args[2:])
+        await self.homework.add(
+            update.effective_chat.id,
+            subject,
+            description,
+            datetime.fromtimestamp(due_at, timezone.utc),
+            update.effective_user.id,
+        )
+        await self.reminders.notify(due_at)
+        await update.message.reply_text(f"✅ {subject} homework added")
+
+    async def _search_homework(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Full-text search over homework: /hwsearch <words>"""
+        query = " ".join(context.args)
+        if not query:
+            await update.message.reply_text("⚠️ Usage: /hwsearch <words>")
+            return
+        text, markup = await self._render_homework_search(update.effective_chat.id, query, 0)
+        await update.message.reply_text(text, parse_mode="HTML", reply_markup=markup)
+
+    async def _page_homework_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Switch pages of a /hwsearch result"""
+        callback = update.callback_query
+        _, page, query = callback.data.split(":", 2)
+        text, markup = await self._render_homework_search(update.effective_chat.id, query, int(page))
+        await callback.answer()
+        await callback.edit_message_text(text, parse_mode="HTML", reply_markup=markup)
+
+    async def _render_homework_search(self, chat_id, query, page):
+        rows, has_more = await self.homework.search(
+            chat_id, query, page=page, page_size=Config.HOMEWORK_SEARCH_PAGE_SIZE
+        )
+        if not rows:
+            return f"🔎 No homework matches “{html.escape(query)}”", None
+
+        lines = [f"🔎 Homework matching “{html.escape(query)}” (page {page + 1}):"]
+        for row in rows:
+            snippet = html.escape(row["snippet"]).replace("\x02", "<b>").replace("\x03", "</b>")
+            due = datetime.fromtimestamp(row["due_at"], timezone.utc) if row["due_at"] else None
+            lines.append(
+                f"• <b>{html.escape(row['subject'])}</b>"
+                + (f" (due {due:%Y-%m-%d})" if due else "")
+                + f": {snippet}"
+            )
+
+        # Callback data is capped at 64 bytes, so very long queries are cut short
+        data_query = query.encode()[:48].decode(errors="ignore")
+        buttons = []
+        if page > 0:
+            buttons.append(InlineKeyboardButton("◀️", callback_data=f"hws:{page - 1}:{data_query}"))
+        if has_more:
+            buttons.append(InlineKeyboardButton("▶️", callback_data=f"hws:{page + 1}:{data_query}"))
+        return "\n".join(lines), InlineKeyboardMarkup([buttons]) if buttons else None
+
+    async def _top_scores(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show the best scores"""
+        count = min(int(context.args[0]), 50) if context.args and context.args[0].isdigit() else 10
+        count = max(count, 1)
+        entries = await self.leaderboard.top(count)
+        if not entries:
+            await update.message.reply_text("🏆 No scores yet")
+            return
+        lines = [
+            f"{rank}. {html.escape(name or str(user_id))} — {score}"
+            for rank, user_id, name, score in entries
+        ]
+        await update.message.reply_text("🏆 Leaderboard:\n" + "\n".join(lines), parse_mode="HTML")
+
+    async def _show_rank(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show the rank of the sender, or of the replied-to user"""
+        reply = update.message.reply_to_message
+        user = reply.from_user if reply else update.effective_user
+        position = await self.leaderboard.rank(user.id)
+        if position is None:
+            await update.message.reply_text(f"🏆 {user.mention_html()} has no score yet", parse_mode="HTML")
+            return
+        rank, score = position
+        await update.message.reply_text(
+            f"🏆 {user.mention_html()} is #{rank} with {score} points", parse_mode="HTML"
+        )
+
+    async def _add_score(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Award points to the replied-to user: /addscore <points>"""
+        reply = update.message.reply_to_message
+        try:
+            points = int(context.args[0])
+        except (IndexError, ValueError):
+            points = None
+        if reply is None or points is None:
+            await update.message.reply_text("⚠️ Reply to a message with /addscore <points>")
+            return
+        user = reply.from_user
+        score = await self.leaderboard.add(user.id, user.username or user.full_name, points)
+        await update.message.reply_text(
+            f"✅ {user.mention_html()} now has {score} points", parse_mode="HTML"
+        )
+
+    async def _reconcile_leaderboard(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job: repair drift between SQLite scores and the Redis leaderboard"""
+        await self.leaderboard.reconcile()
+
     async def _warn_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Warn system with Redis persistence"""
         if not update.message.reply_to_message:
@@ -53,28 +401,330 @@ class GroupManager:
             return
             
         user = update.message.reply_to_message.from_user
-        chat_id = update.effective_chat.id
+        await self._add_warning(update.message, user, context)
+
+    async def _show_warnings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show live warnings of the sender, or of the replied-to user"""
+        reply = update.message.reply_to_message
+        user = reply.from_user if reply else update.effective_user
+        warnings = await self.warnings.count(update.effective_chat.id, user.id)
+        await update.message.reply_text(
+            f"⚠️ {user.mention_html()} has {warnings}/{Config.MAX_WARNINGS} warnings",
+            parse_mode="HTML"
+        )
+
+    async def _list_warnings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """List every user of the chat with live warnings"""
+        warned = await self.warnings.warned(update.effective_chat.id)
+        if not warned:
+            await update.message.reply_text("✅ No active warnings")
+            return
+        lines = [
+            f"• {mention_html(user_id, str(user_id))}: {count}/{Config.MAX_WARNINGS}"
+            for user_id, count in sorted(warned.items(), key=lambda item: -item[1])
+        ]
+        await update.message.reply_text(
+            "⚠️ Active warnings:\n" + "\n".join(lines), parse_mode="HTML"
+        )
+
+    async def _add_warning(self, message, user, context: ContextTypes.DEFAULT_TYPE):
+        """Record a warning for ``user`` in reply to ``message``; ban at MAX_WARNINGS"""
+        chat_id = message.chat_id
         
-        # Store warning in Redis
-        warn_key = f"warns:{chat_id}:{user.id}"
-        warnings = redis_conn.incr(warn_key)
+        # The count is reset on escalation
+        warnings, escalate = await self.warnings.warn(chat_id, user.id)
         
-        await update.message.reply_text(
+        await message.reply_text(
             f"⚠️ Warning issued to {user.mention_html()} "
             f"(Total: {warnings}/{Config.MAX_WARNINGS})",
             parse_mode="HTML"
         )
         
-        if warnings >= Config.MAX_WARNINGS:
-            await self._ban_user(update, context)
-            redis_conn.delete(warn_key)
+        if escalate:
+            await context.bot.ban_chat_member(chat_id, user.id)
+
+    async def _is_admin(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Check whether the sender administers the current chat"""
+        chat = update.effective_chat
+        if chat.type == chat.PRIVATE:
+            return False
+        message = update.effective_message
+        # Anonymous admins post on behalf of the group itself
+        if message is not None and message.sender_chat is not None:
+            return message.sender_chat.id == chat.id
+        return await self.admins.is_admin(context.bot, chat.id, update.effective_user.id)
+
+    async def _gate_admin_commands(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Stop ADMIN_COMMANDS from non-admins before any command handler runs"""
+        command = update.effective_message.text.split(maxsplit=1)[0][1:]
+        command = command.split("@", 1)[0].lower()
+        if command in Config.ADMIN_COMMANDS and not await self._is_admin(update, context):
+            await update.effective_message.reply_text("⛔ This command is for admins only")
+            raise ApplicationHandlerStop
+
+    async def _track_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Queue the sender for the batched users table upsert"""
+        if update.effective_user is not None:
+            self.users.track(update.effective_user)
+
+    async def _track_admins(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Keep the admin cache in sync with promotions and demotions"""
+        await self.admins.on_member_update(update.chat_member)
+
+    async def _check_flood(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Warn or mute users sending messages faster than the flood limit"""
+        message = update.effective_message
+        user = update.effective_user
+        if user is None or not await self.flood.hit(message.chat_id, user.id):
+            return
+        if await self._is_admin(update, context):
+            return
+
+        logger.info("Flood from %s in %s", user.id, message.chat_id)
+        if Config.FLOOD_ACTION == "warn":
+            await self._add_warning(message, user, context)
+        else:
+            await context.bot.restrict_chat_member(
+                message.chat_id,
+                user.id,
+                ChatPermissions.no_permissions(),
+                until_date=timedelta(seconds=Config.FLOOD_MUTE_SECONDS),
+            )
+            await message.reply_text(
+                f"🔇 {user.mention_html()} muted for flooding",
+                parse_mode="HTML"
+            )
+
+    async def _handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Moderate regular text messages"""
+        message = update.effective_message
+        matcher = await self.phrases.matcher(update.effective_chat.id)
+        phrase = matcher.search(message.text)
+        if phrase is not None:
+            logger.info("Deleting message in %s matching %r", message.chat_id, phrase)
+            await message.delete()
+
+    async def _add_phrase(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Ban a phrase in this chat"""
+        phrase = " ".join(context.args)
+        if not phrase:
+            await update.message.reply_text("⚠️ Usage: /addphrase <text>")
+            return
+        if await self.phrases.add(update.effective_chat.id, phrase):
+            await update.message.reply_text("🚫 Phrase banned")
+        else:
+            await update.message.reply_text("ℹ️ Phrase already banned")
+
+    async def _remove_phrase(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Allow a previously banned phrase"""
+        phrase = " ".join(context.args)
+        if await self.phrases.remove(update.effective_chat.id, phrase):
+            await update.message.reply_text("✅ Phrase removed")
+        else:
+            await update.message.reply_text("ℹ️ Phrase is not banned")
+
+    async def _list_phrases(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """List banned phrases of this chat"""
+        matcher = await self.phrases.matcher(update.effective_chat.id)
+        if not len(matcher):
+            await update.message.reply_text("ℹ️ No banned phrases")
+            return
+        await update.message.reply_text(
+            "🚫 Banned phrases:\n" + "\n".join(f"• {p}" for p in matcher.phrases)
+        )
+
+    async def _welcome_new_members(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Greet new members, or lock them down while the chat is being raided"""
+        message = update.effective_message
+        chat_id = message.chat_id
+        members = [m for m in message.new_chat_members if m.id != context.bot.id]
+        if not members:
+            return
+
+        in_raid, started, earlier = self.raids.record_joins(chat_id, [m.id for m in members])
+        if in_raid:
+            # The joins that tripped detection were let in before it fired
+            await self._restrict_raiders(context, chat_id, earlier + [m.id for m in members])
+            if started:
+                logger.warning("Raid detected in %s", chat_id)
+                # Do not greet the members just restricted
+                self.welcomes.discard(chat_id)
+                context.job_queue.run_once(
+                    self._end_raid, Config.RAID_COOLDOWN, chat_id=chat_id
+                )
+                await context.bot.send_message(
+                    chat_id,
+                    "🚨 Raid detected: welcomes are paused and new members are "
+                    "restricted until things calm down.",
+                    rate_limit_args=Priority.MODERATION,
+                )
+            return
+
+        mentions = [m.mention_html() for m in members if not m.is_bot]
+        if mentions:
+            self.welcomes.add(chat_id, mentions)
+
+    async def _send_welcome(self, chat_id, text):
+        if Config.WELCOME_PHOTO:
+            return await self.media.send_photo(
+                self.app.bot, chat_id, Config.WELCOME_PHOTO,
+                caption=text, parse_mode="HTML", rate_limit_args=Priority.BULK,
+            )
+        return await self.app.bot.send_message(
+            chat_id, text, parse_mode="HTML", rate_limit_args=Priority.BULK
+        )
+
+    async def _send_reminder(self, chat_id, text):
+        await self.app.bot.send_message(
+            chat_id, text, parse_mode="HTML", rate_limit_args=Priority.BULK
+        )
+
+    async def _delete_welcome(self, chat_id, message_id):
+        await self.app.bot.delete_message(chat_id, message_id, rate_limit_args=Priority.BULK)
+
+    async def _restrict_raiders(self, context: ContextTypes.DEFAULT_TYPE, chat_id, user_ids):
+        """Mute every member who joined during a raid"""
+        until = timedelta(seconds=Config.RAID_RESTRICT_SECONDS)
+        results = await asyncio.gather(
+            *(
+                context.bot.restrict_chat_member(
+                    chat_id, user_id, ChatPermissions.no_permissions(), until_date=until
+                )
+                for user_id in user_ids
+            ),
+            return_exceptions=True,
+        )
+        for user_id, result in zip(user_ids, results):
+            if isinstance(result, Exception):
+                logger.warning("Could not restrict %s in %s: %s", user_id, chat_id, result)
+
+    async def _end_raid(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job: leave raid mode once no one has joined for RAID_COOLDOWN seconds"""
+        chat_id = context.job.chat_id
+        remaining = self.raids.remaining(chat_id)
+        if remaining:
+            context.job_queue.run_once(self._end_raid, remaining, chat_id=chat_id)
+            return
+        joined = self.raids.end(chat_id)
+        logger.info("Raid in %s ended (%d joins)", chat_id, joined)
+        await context.bot.send_message(
+            chat_id,
+            f"✅ Raid mode ended. {joined} members who joined meanwhile stay restricted "
+            "for a while; admins can lift it earlier.",
+            rate_limit_args=Priority.MODERATION,
+        )
 
     # Add other methods (_ban_user, _mute_user, etc.)
 
+    async def _enqueue_update(self, data: dict):
+        """Decode a raw webhook payload and hand it to the Application"""
+        await self.app.update_queue.put(Update.de_json(data, self.app.bot))
+
+    async def serve(self, ingress, stop=None):
+        """Run the Application fed by ``ingress`` (async start/stop)
+
+        Blocks until ``stop`` is set, or until SIGINT/SIGTERM when no event is given.
+        """
+        if stop is None:
+            stop = asyncio.Event()
+            _set_on_stop_signal(stop)
+        await self.app.initialize()
+        await self._post_init(self.app)
+        try:
+            await self.app.start()
+            await ingress.start()
+            await stop.wait()
+        finally:
+            await ingress.stop()
+            if self.app.running:
+                await self.app.stop()
+                await self._post_stop(self.app)
+            await self.app.shutdown()
+            await self._post_shutdown(self.app)
+
+    async def run_webhook(self):
+        """Serve updates from the built-in webhook server"""
+        async with Bot(Config.TOKEN) as bot:
+            await _set_webhook(bot)
+        await self.serve(_webhook_server(self._enqueue_update))
+
+
+def _webhook_server(sink):
+    return WebhookServer(
+        sink,
+        listen=Config.WEBHOOK_LISTEN,
+        port=Config.WEBHOOK_PORT,
+        path=Config.WEBHOOK_PATH,
+        secret_token=Config.WEBHOOK_SECRET_TOKEN,
+    )
+
+async def _set_webhook(bot: Bot):
+    await bot.set_webhook(
+        url=Config.WEBHOOK_URL.rstrip("/") + Config.WEBHOOK_PATH,
+        secret_token=Config.WEBHOOK_SECRET_TOKEN,
+        allowed_updates=Update.ALL_TYPES,
+    )
+
+def _set_on_stop_signal(stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+def _setup_logging():
+    setup_logging(
+        level=Config.LOG_LEVEL,
+        json=Config.LOG_FORMAT == "json",
+        summary_interval=Config.LOG_SUMMARY_SECONDS,
+    )
+
+def run_shard_worker(index, queue):
+    """Entry point of a shard worker process"""
+    # The supervisor owns shutdown: it drains the ingress, then sends a sentinel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    _setup_logging()
+    try:
+        manager = GroupManager(shard=index)
+        closed = asyncio.Event()
+        asyncio.run(manager.serve(QueueIngress(queue, manager._enqueue_update, closed), stop=closed))
+    finally:
+        # Worker processes exit without running atexit hooks
+        stop_logging()
+
+async def _run_supervisor(supervisor: ShardSupervisor):
+    if Config.UPDATE_MODE == "webhook":
+        async with Bot(Config.TOKEN) as bot:
+            await _set_webhook(bot)
+        ingress = _webhook_server(supervisor.route)
+    else:
+        ingress = PollingIngress(
+            Config.TOKEN,
+            supervisor.route,
+            timeout=Config.POLL_TIMEOUT,
+            allowed_updates=Update.ALL_TYPES,
+        )
+    await supervisor.run(ingress)
+
 def main():
     """Run the bot"""
+    if Config.UPDATE_MODE == "webhook" and not Config.WEBHOOK_SECRET_TOKEN:
+        # A per-process secret would lock out every replica but the last one started
+        raise SystemExit("WEBHOOK_SECRET_TOKEN must be set in webhook mode")
+    _setup_logging()
+    if Config.WORKERS > 1:
+        supervisor = ShardSupervisor(run_shard_worker, Config.WORKERS)
+        supervisor.start_workers()
+        try:
+            asyncio.run(_run_supervisor(supervisor))
+        finally:
+            supervisor.stop_workers()
+        return
+
     manager = GroupManager()
-    manager.app.run_polling()
+    if Config.UPDATE_MODE == "webhook":
+        asyncio.run(manager.run_webhook())
+    else:
+        manager.app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -9,7 +9,98 @@ class Config:
     
     # Redis Configuration
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+    
+    # Update ingestion: "polling" or "webhook"
+    UPDATE_MODE = os.getenv("UPDATE_MODE", "polling")
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public base URL, e.g. https://bot.example.com
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("PORT", os.getenv("WEBHOOK_PORT", "8443")))
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    # Sent by Telegram with every webhook call; required in webhook mode and
+    # shared by every replica behind the same URL
+    WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+    
+    # Worker processes; above 1 a supervisor shards updates across them by chat_id
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", "10"))
+    
+    # Logging: LOG_FORMAT "json" or "text"; successful Bot API request lines
+    # are folded into one summary per LOG_SUMMARY_SECONDS
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    LOG_SUMMARY_SECONDS = float(os.getenv("LOG_SUMMARY_SECONDS", "60"))
+    
+    # Prometheus /metrics endpoint, off unless a port is set (e.g. 9464);
+    # shard workers listen on port + index
+    METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    
+    # Update processing: handlers running at once / updates admitted for processing
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
+    MAX_PENDING_UPDATES = int(os.getenv("MAX_PENDING_UPDATES", "4096"))
+    
+    # SQLite database
+    DATABASE_PATH = os.getenv("DATABASE_PATH", "grade10_bot.db")
+    DATABASE_READERS = int(os.getenv("DATABASE_READERS", "4"))
+    # Homework reminders: sent this long before the due date
+    REMINDER_LEAD_HOURS = float(os.getenv("REMINDER_LEAD_HOURS", "24"))
+    # Longest scheduler sleep, so homework added by other workers is noticed
+    REMINDER_RESYNC_SECONDS = int(os.getenv("REMINDER_RESYNC_SECONDS", "900"))
+    # Score deltas are written to SQLite every SCORE_FLUSH_MS or SCORE_FLUSH_MAX updates
+    SCORE_FLUSH_MS = int(os.getenv("SCORE_FLUSH_MS", "500"))
+    SCORE_FLUSH_MAX = int(os.getenv("SCORE_FLUSH_MAX", "500"))
+    # Changed user profiles are upserted every USER_FLUSH_MS or USER_FLUSH_MAX changes
+    USER_FLUSH_MS = int(os.getenv("USER_FLUSH_MS", "5000"))
+    USER_FLUSH_MAX = int(os.getenv("USER_FLUSH_MAX", "1000"))
+    LEADERBOARD_RECONCILE_SECONDS = int(os.getenv("LEADERBOARD_RECONCILE_SECONDS", "3600"))
+    HOMEWORK_SEARCH_PAGE_SIZE = int(os.getenv("HOMEWORK_SEARCH_PAGE_SIZE", "5"))
+    
+    # Outbound Bot API rate limits (messages/s unless noted)
+    RATE_LIMIT_GLOBAL = float(os.getenv("RATE_LIMIT_GLOBAL", "30"))
+    RATE_LIMIT_GROUP_PER_MINUTE = float(os.getenv("RATE_LIMIT_GROUP_PER_MINUTE", "20"))
+    RATE_LIMIT_PRIVATE = float(os.getenv("RATE_LIMIT_PRIVATE", "1"))
+    RATE_LIMIT_MODERATION = float(os.getenv("RATE_LIMIT_MODERATION", "30"))
+    RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "2"))
     
     # Bot Settings
     MAX_WARNINGS = 3
-    ADMIN_COMMANDS = ['warn', 'ban', 'mute', 'unmute', 'kick', 'setrules']
\ No newline at end of file
+    # Each warning expires this many days after it was issued (0 = never)
+    WARN_DECAY_DAYS = float(os.getenv("WARN_DECAY_DAYS", "30"))
+    # Warning counts are checkpointed from Redis to SQLite this often
+    WARN_CHECKPOINT_MS = int(os.getenv("WARN_CHECKPOINT_MS", "1000"))
+    # Redis layout for warnings: "keys" (one key per user) or "hash" (one per chat)
+    WARN_LAYOUT = os.getenv("WARN_LAYOUT", "keys")
+    ADMIN_COMMANDS = ['warn', 'warnlist', 'ban', 'mute', 'unmute', 'kick', 'setrules',
+                      'addphrase', 'delphrase', 'phrases', 'addhomework', 'addscore']
+    # Chat administrator cache: shared Redis copy / per-process copy, in seconds
+    ADMIN_CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", "600"))
+    ADMIN_CACHE_LOCAL_TTL = int(os.getenv("ADMIN_CACHE_LOCAL_TTL", "60"))
+    PHRASE_CACHE_CHATS = int(os.getenv("PHRASE_CACHE_CHATS", "10000"))
+    
+    # Welcomes: joins within WELCOME_WINDOW seconds share one message
+    WELCOME_WINDOW = float(os.getenv("WELCOME_WINDOW", "5"))
+    WELCOME_MAX_MENTIONS = int(os.getenv("WELCOME_MAX_MENTIONS", "20"))
+    WELCOME_REPLACE_PREVIOUS = os.getenv("WELCOME_REPLACE_PREVIOUS", "false").lower() == "true"
+    
+    # Optional images sent with welcomes and /rules (local file paths)
+    WELCOME_PHOTO = os.getenv("WELCOME_PHOTO")
+    RULES_PHOTO = os.getenv("RULES_PHOTO")
+    DEFAULT_RULES = os.getenv("DEFAULT_RULES", "Be respectful.\nNo spam.\nStay on topic.")
+    RULES_CACHE_CHATS = int(os.getenv("RULES_CACHE_CHATS", "10000"))
+    
+    # Raid mode: RAID_JOIN_THRESHOLD joins within RAID_WINDOW seconds
+    RAID_JOIN_THRESHOLD = int(os.getenv("RAID_JOIN_THRESHOLD", "10"))
+    RAID_WINDOW = float(os.getenv("RAID_WINDOW", "30"))
+    RAID_COOLDOWN = float(os.getenv("RAID_COOLDOWN", "300"))  # quiet seconds before leaving
+    RAID_RESTRICT_SECONDS = int(os.getenv("RAID_RESTRICT_SECONDS", "3600"))
+    
+    # Flood control: FLOOD_LIMIT messages within FLOOD_WINDOW seconds
+    FLOOD_LIMIT = int(os.getenv("FLOOD_LIMIT", "5"))
+    FLOOD_WINDOW = float(os.getenv("FLOOD_WINDOW", "3"))
+    FLOOD_ACTION = os.getenv("FLOOD_ACTION", "mute")  # "mute" or "warn"
+    FLOOD_MUTE_SECONDS = int(os.getenv("FLOOD_MUTE_SECONDS", "300"))
+    # "local" ring buffers, or "redis" when one chat's updates reach several processes
+    FLOOD_BACKEND = os.getenv("FLOOD_BACKEND", "local")
\ No newline at end of file
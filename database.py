@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # durable at checkpoints; safe with WAL
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",  # 16 MiB page cache per connection
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+# Formats accepted for legacy homework.due_date text values
+_DUE_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y")
+
+
+def parse_due_date(value):
+    """Epoch seconds (UTC) of a due date string, or None if unparseable"""
+    for fmt in _DUE_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value.strip(), fmt)
+        except (AttributeError, ValueError):
+            continue
+        return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+    return None
+
+
+def _initial_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS homework (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER,
+            subject TEXT,
+            description TEXT,
+            due_date TEXT,
+            added_by INTEGER,
+            added_date TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            join_date TEXT,
+            warnings INTEGER DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scores (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            score INTEGER DEFAULT 0
+        )
+    """)
+
+
+def _homework_due_index(conn):
+    # due_date stays as entered for display; due_at is the sortable epoch copy
+    conn.execute("ALTER TABLE homework ADD COLUMN due_at INTEGER")
+    rows = conn.execute("SELECT id, due_date FROM homework").fetchall()
+    conn.executemany(
+        "UPDATE homework SET due_at = ? WHERE id = ?",
+        [(parse_due_date(due_date), row_id) for row_id, due_date in rows],
+    )
+    # Both return rows already in due order, so listings need no sort and only
+    # the LIMITed rows are read from the table
+    conn.execute("CREATE INDEX idx_homework_chat_due ON homework (chat_id, due_at, subject)")
+    conn.execute(
+        "CREATE INDEX idx_homework_chat_subject ON homework (chat_id, subject COLLATE NOCASE, due_at)"
+    )
+
+
+def _homework_search(conn):
+    # External-content FTS5 index; the view adds a per-chat token so a search
+    # only walks the postings of its own chat
+    conn.execute("""
+        CREATE VIEW homework_fts_source AS
+        SELECT id, 'c' || replace(chat_id, '-', 'n') AS chat, subject, description
+        FROM homework
+    """)
+    conn.execute("""
+        CREATE VIRTUAL TABLE homework_fts USING fts5(
+            chat, subject, description,
+            content='homework_fts_source', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER homework_fts_insert AFTER INSERT ON homework BEGIN
+            INSERT INTO homework_fts (rowid, chat, subject, description)
+            VALUES (new.id, 'c' || replace(new.chat_id, '-', 'n'), new.subject, new.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER homework_fts_delete AFTER DELETE ON homework BEGIN
+            INSERT INTO homework_fts (homework_fts, rowid, chat, subject, description)
+            VALUES ('delete', old.id, 'c' || replace(old.chat_id, '-', 'n'), old.subject, old.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER homework_fts_update AFTER UPDATE OF chat_id, subject, description ON homework BEGIN
+            INSERT INTO homework_fts (homework_fts, rowid, chat, subject, description)
+            VALUES ('delete', old.id, 'c' || replace(old.chat_id, '-', 'n'), old.subject, old.description);
+            INSERT INTO homework_fts (rowid, chat, subject, description)
+            VALUES (new.id, 'c' || replace(new.chat_id, '-', 'n'), new.subject, new.description);
+        END
+    """)
+    conn.execute("INSERT INTO homework_fts (homework_fts) VALUES ('rebuild')")
+
+
+def _reminder_state(conn):
+    # Reminders walk homework in due order across all chats
+    conn.execute("CREATE INDEX idx_homework_due ON homework (due_at)")
+    conn.execute("CREATE TABLE scheduler_state (name TEXT PRIMARY KEY, value INTEGER)")
+
+
+def _chat_warnings(conn):
+    # Durable per-chat warning counts; users.warnings holds each user's total
+    conn.execute("""
+        CREATE TABLE chat_warnings (
+            chat_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (chat_id, user_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _warning_timestamps(conn):
+    # Epoch seconds of the latest warning, so decayed counts are not restored
+    conn.execute("ALTER TABLE chat_warnings ADD COLUMN warned_at INTEGER")
+
+
+# Applied in order; PRAGMA user_version records how many have run
+MIGRATIONS = (
+    _initial_schema,
+    _homework_due_index,
+    _homework_search,
+    _reminder_state,
+    _chat_warnings,
+    _warning_timestamps,
+)
+
+
+def migrate(conn):
+    """Bring the schema of ``conn`` up to date; returns the new version"""
+    while True:
+        # Re-read under the write lock: another shard may have migrated meanwhile
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(MIGRATIONS):
+                conn.execute("COMMIT")
+                return version
+            migration = MIGRATIONS[version]
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        logger.info("Applied database migration %d (%s)", version + 1, migration.__name__)
+
+
+class Database:
+    """Async access to the SQLite database
+
+    Writes are serialized on one dedicated thread and connection, reads run
+    on a small pool of read-only connections. With WAL journaling readers
+    never wait for the writer. Each connection keeps a cache of prepared
+    statements, so repeated queries are only compiled once.
+    """
+
+    def __init__(self, path, readers=4, busy_timeout=5.0, statement_cache=256):
+        self.path = path
+        self.readers = readers
+        self.busy_timeout = busy_timeout
+        self.statement_cache = statement_cache
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._writer = None
+        self._reader = None
+
+    def _connect(self, read_only):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,  # explicit transactions only
+            check_same_thread=False,
+            cached_statements=self.statement_cache,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        self._local.conn = conn
+        with self._lock:
+            self._connections.append(conn)
+
+    async def open(self):
+        self._writer = ThreadPoolExecutor(
+            1, thread_name_prefix="sqlite-writer", initializer=self._connect, initargs=(False,)
+        )
+        self._reader = ThreadPoolExecutor(
+            self.readers, thread_name_prefix="sqlite-reader",
+            initializer=self._connect, initargs=(True,),
+        )
+        # Migrate on the writer first so readers see WAL mode and the final schema
+        await self._run(self._writer, migrate)
+        logger.info("SQLite database %s opened", self.path)
+
+    async def close(self):
+        for executor in (self._reader, self._writer):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        self._reader = self._writer = None
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    async def _run(self, executor, fn):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, lambda: fn(self._local.conn))
+
+    async def read(self, fn):
+        """Run ``fn(connection)`` on a read-only connection"""
+        return await self._run(self._reader, fn)
+
+    async def transaction(self, fn):
+        """Run ``fn(connection)`` inside one write transaction on the writer thread"""
+        def run(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+        return await self._run(self._writer, run)
+
+    async def fetchall(self, sql, params=()):
+        return await self.read(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def fetchone(self, sql, params=()):
+        return await self.read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def execute(self, sql, params=()):
+        """Run one write statement; returns its cursor"""
+        return await self.transaction(lambda conn: conn.execute(sql, params))
+
+    async def executemany(self, sql, seq_of_params):
+        return await self.transaction(lambda conn: conn.executemany(sql, seq_of_params))
+
+
+class WriteBehindBuffer:
+    """Base for in-memory write buffers flushed to SQLite in batches
+
+    Subclasses record pending writes, call :meth:`_updated` for each one and
+    implement :meth:`_write`, which takes over the pending state and writes
+    it, putting it back if the write fails. A flush runs every ``flush_interval`` seconds, as soon as
+    ``flush_max`` updates are pending, and on :meth:`close`.
+    """
+
+    def __init__(self, flush_interval=0.5, flush_max=500):
+        self.flush_interval = flush_interval
+        self.flush_max = flush_max
+        self._updates = 0
+        self._flush_lock = asyncio.Lock()
+        self._flusher = None
+        self._early_flush = None
+
+    async def start(self):
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Stop the flusher and write out everything pending"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("%s flush failed, will retry", type(self).__name__)
+
+    def _updated(self):
+        self._updates += 1
+        if self._updates >= self.flush_max and (
+            self._early_flush is None or self._early_flush.done()
+        ):
+            self._early_flush = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        async with self._flush_lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        # Caller holds the flush lock. The count is only dropped once the write
+        # succeeded: a failed _write() puts its state back for the next flush
+        updates = self._updates
+        if not updates:
+            return
+        await self._write()
+        self._updates = max(0, self._updates - updates)
+
+    async def _write(self):
+        raise NotImplementedError
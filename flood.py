@@ -0,0 +1,58 @@
+import time
+from collections import deque
+
+
+class LocalFloodDetector:
+    """Per (chat, user) ring buffers of the last ``limit`` message timestamps
+
+    A user floods when ``limit`` messages fit inside ``window`` seconds. Each
+    check is O(1); buffers idle for longer than the window are swept
+    periodically.
+    """
+
+    def __init__(self, limit, window, sweep_every=10000):
+        self.limit = limit
+        self.window = window
+        self.sweep_every = sweep_every
+        self._buffers = {}
+        self._checks = 0
+
+    async def hit(self, chat_id, user_id):
+        """Record a message; returns True when it pushes the user over the limit"""
+        now = time.monotonic()
+        self._checks += 1
+        if self._checks % self.sweep_every == 0:
+            self._sweep(now)
+
+        key = (chat_id, user_id)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = deque(maxlen=self.limit)
+        buffer.append(now)
+        if len(buffer) == self.limit and now - buffer[0] < self.window:
+            # Start over so the next trigger needs another full burst
+            buffer.clear()
+            return True
+        return False
+
+    def _sweep(self, now):
+        stale = [k for k, b in self._buffers.items() if not b or now - b[-1] >= self.window]
+        for key in stale:
+            del self._buffers[key]
+
+
+class RedisFloodDetector:
+    """Same ring buffer kept in a capped Redis list, for multi-process deployments"""
+
+    def __init__(self, storage, limit, window):
+        self.storage = storage
+        self.limit = limit
+        self.window = window
+
+    async def hit(self, chat_id, user_id):
+        flooding = await self.storage.run_script(
+            "flood",
+            keys=(f"flood:{chat_id}:{user_id}",),
+            args=(int(time.time() * 1000), self.limit, int(self.window * 1000)),
+        )
+        return bool(flooding)
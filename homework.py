@@ -0,0 +1,84 @@
+import re
+from datetime import datetime, timezone
+
+UPCOMING_SQL = (
+    "SELECT id, subject, description, due_at FROM homework "
+    "WHERE chat_id = ? AND due_at >= ? ORDER BY due_at LIMIT ?"
+)
+BY_SUBJECT_SQL = (
+    "SELECT id, subject, description, due_at FROM homework "
+    "WHERE chat_id = ? AND subject = ? COLLATE NOCASE AND due_at >= ? "
+    "ORDER BY due_at LIMIT ?"
+)
+SEARCH_SQL = (
+    "SELECT h.id, h.subject, h.due_at, "
+    "snippet(homework_fts, 2, char(2), char(3), '…', 12) AS snippet "
+    "FROM homework_fts JOIN homework h ON h.id = homework_fts.rowid "
+    "WHERE homework_fts MATCH ? "
+    "ORDER BY bm25(homework_fts, 0.0, 2.0, 1.0) LIMIT ? OFFSET ?"
+)
+INSERT_SQL = (
+    "INSERT INTO homework (chat_id, subject, description, due_date, due_at, added_by, added_date) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _now():
+    return int(datetime.now(timezone.utc).timestamp())
+
+
+def chat_token(chat_id):
+    """FTS token scoping a search to one chat; must match the homework_fts triggers"""
+    return "c" + str(chat_id).replace("-", "n")
+
+
+def build_match(chat_id, query):
+    """FTS5 MATCH expression for free-text ``query``, or None if it has no words
+
+    Every word is quoted so user input cannot inject FTS syntax; the last one
+    matches as a prefix to support search-as-you-type queries.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return f"chat : {chat_token(chat_id)} AND " + " ".join(terms)
+
+
+class HomeworkRepository:
+    """Homework queries on top of :class:`database.Database`"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def add(self, chat_id, subject, description, due, added_by):
+        """Store homework due at ``due`` (aware datetime); returns its id"""
+        cursor = await self.db.execute(INSERT_SQL, (
+            chat_id,
+            subject,
+            description,
+            due.strftime("%Y-%m-%d %H:%M"),
+            int(due.timestamp()),
+            added_by,
+            datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        ))
+        return cursor.lastrowid
+
+    async def upcoming(self, chat_id, limit=10, since=None):
+        return await self.db.fetchall(
+            UPCOMING_SQL, (chat_id, _now() if since is None else since, limit)
+        )
+
+    async def by_subject(self, chat_id, subject, limit=10, since=None):
+        return await self.db.fetchall(
+            BY_SUBJECT_SQL, (chat_id, subject, _now() if since is None else since, limit)
+        )
+
+    async def search(self, chat_id, query, page=0, page_size=5):
+        """Ranked matches for ``query``; returns (rows, has_more)"""
+        match = build_match(chat_id, query)
+        if match is None:
+            return [], False
+        rows = await self.db.fetchall(SEARCH_SQL, (match, page_size + 1, page * page_size))
+        return rows[:page_size], len(rows) > page_size
@@ -0,0 +1,120 @@
+import logging
+from database import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+ADD_SCORE_SQL = (
+    "INSERT INTO scores (user_id, username, score) VALUES (?, ?, ?) "
+    "ON CONFLICT (user_id) DO UPDATE SET "
+    "score = score + excluded.score, username = COALESCE(excluded.username, username)"
+)
+
+
+class Leaderboard(WriteBehindBuffer):
+    """Scores mirrored into a Redis sorted set for O(log n) rank queries
+
+    SQLite's scores table stays the source of truth. Changes hit the sorted
+    set immediately, while their SQLite writes are buffered per user and
+    flushed in one transaction every ``flush_interval`` seconds or once
+    ``flush_max`` updates are pending. :meth:`reconcile` periodically rebuilds
+    the set from SQLite to repair any drift; changes made while it runs are
+    journaled in Redis and replayed onto the rebuilt set before it is swapped in.
+    """
+
+    KEY = "leaderboard:scores"
+    NAMES_KEY = "leaderboard:names"
+    STAGING_KEY = "leaderboard:scores:rebuild"
+    JOURNAL_KEY = "leaderboard:scores:journal"
+
+    def __init__(self, storage, db, batch_size=5000, flush_interval=0.5, flush_max=500):
+        super().__init__(flush_interval, flush_max)
+        self.storage = storage
+        self.db = db
+        self.batch_size = batch_size
+        self._pending = {}  # user_id -> [username, summed delta]
+        self._rebuilding = False
+
+    async def _write(self):
+        """Write buffered deltas to SQLite in a single transaction"""
+        pending, self._pending = self._pending, {}
+        rows = [(user_id, name, delta) for user_id, (name, delta) in pending.items()]
+        try:
+            await self.db.transaction(lambda conn: conn.executemany(ADD_SCORE_SQL, rows))
+        except BaseException:
+            # Put the deltas back so the next flush retries them
+            for user_id, (name, delta) in pending.items():
+                self._buffer(user_id, name, delta)
+            raise
+
+    def _buffer(self, user_id, username, delta):
+        entry = self._pending.get(user_id)
+        if entry is None:
+            self._pending[user_id] = [username, delta]
+        else:
+            entry[0] = username or entry[0]
+            entry[1] += delta
+        self._updated()
+
+    async def add(self, user_id, username, delta):
+        """Add ``delta`` points to a user; returns the new score"""
+        self._buffer(user_id, username, delta)
+        score = await self.storage.run_script(
+            "leaderboard_add",
+            keys=(self.KEY, self.JOURNAL_KEY, self.NAMES_KEY),
+            args=(user_id, delta, username or "", int(self._rebuilding)),
+        )
+        return int(float(score))
+
+    async def top(self, count=10):
+        """[(rank, user_id, username, score)] for the ``count`` best users"""
+        entries = await self.storage.client.zrevrange(self.KEY, 0, count - 1, withscores=True)
+        if not entries:
+            return []
+        names = await self.storage.client.hmget(self.NAMES_KEY, [member for member, _ in entries])
+        return [
+            (rank, int(member), name.decode() if name else None, int(score))
+            for rank, ((member, score), name) in enumerate(zip(entries, names), 1)
+        ]
+
+    async def rank(self, user_id):
+        """(rank, score) of a user, or None if they have no score"""
+        async with self.storage.client.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(self.KEY, user_id)
+            pipe.zscore(self.KEY, user_id)
+            rank, score = await pipe.execute()
+        if rank is None:
+            return None
+        return rank + 1, int(score)
+
+    async def reconcile(self):
+        """Rebuild the sorted set from SQLite and swap it in atomically"""
+        client = self.storage.client
+        await client.delete(self.STAGING_KEY, self.JOURNAL_KEY)
+        try:
+            # Deltas buffered from here on are journaled instead of being in the
+            # snapshot: the flush lock keeps them out of SQLite until it is read
+            async with self._flush_lock:
+                self._rebuilding = True
+                await self._flush_locked()
+                await client.hset(self.JOURNAL_KEY, "", 0)
+                rows = await self.db.fetchall("SELECT user_id, username, score FROM scores")
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                async with client.pipeline(transaction=False) as pipe:
+                    pipe.zadd(self.STAGING_KEY, {row["user_id"]: row["score"] or 0 for row in batch})
+                    names = {row["user_id"]: row["username"] for row in batch if row["username"]}
+                    if names:
+                        pipe.hset(self.NAMES_KEY, mapping=names)
+                    await pipe.execute()
+            replayed = await self.storage.run_script(
+                "leaderboard_swap", keys=(self.STAGING_KEY, self.KEY, self.JOURNAL_KEY)
+            )
+        except BaseException:
+            await client.delete(self.STAGING_KEY, self.JOURNAL_KEY)
+            raise
+        finally:
+            self._rebuilding = False
+        logger.info(
+            "Leaderboard reconciled from %d score rows, %d users replayed from the journal",
+            len(rows), replayed,
+        )
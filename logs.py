@@ -0,0 +1,146 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import time
+from collections import Counter
+import orjson
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Bot API URLs embed the token: https://api.telegram.org/bot<id>:<secret>/method
+_TOKEN_RE = re.compile(r"bot\d+:[A-Za-z0-9_-]{30,}")
+_HTTPX_SUCCESS_RE = re.compile(r'^HTTP Request: \w+ \S+/(\w+) "HTTP/[\d.]+ 2\d\d ')
+
+_listener = None
+_listener_pid = None
+_summaries = None
+
+
+def redact(text):
+    """Replace Bot API tokens in ``text``"""
+    return _TOKEN_RE.sub("bot<redacted>", text)
+
+
+class RedactingFormatter(logging.Formatter):
+    """Text formatter that never prints the bot token"""
+
+    def format(self, record):
+        return redact(super().format(record))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the bot token redacted"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "msg": redact(record.getMessage()),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = redact(record.exc_text)
+        return orjson.dumps(entry).decode()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # Unlike the stock prepare(), keeps the traceback apart from the message
+    # so the listener's formatter decides how to render it
+    def prepare(self, record):
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+
+class SuccessSummaryFilter(logging.Filter):
+    """Folds httpx success lines into one summary per ``interval`` seconds
+
+    Successful requests are only counted per Bot API method; failures and
+    every other record pass through untouched. The summary is logged by
+    ``httpx.summary`` once the interval is over and the next record arrives.
+    """
+
+    def __init__(self, interval=60.0):
+        super().__init__()
+        self.interval = interval
+        self._counts = Counter()
+        self._since = time.monotonic()
+        self._summary = logging.getLogger("httpx.summary")
+
+    def filter(self, record):
+        if record.name == "httpx" and record.levelno == logging.INFO:
+            match = _HTTPX_SUCCESS_RE.match(record.getMessage())
+            if match:
+                self._counts[match.group(1)] += 1
+                self._maybe_summarize()
+                return False
+        self._maybe_summarize()
+        return True
+
+    def _maybe_summarize(self):
+        if time.monotonic() - self._since >= self.interval:
+            self.summarize()
+
+    def summarize(self):
+        """Log the counts gathered so far and start a new interval"""
+        counts, self._counts = self._counts, Counter()
+        elapsed, self._since = time.monotonic() - self._since, time.monotonic()
+        if counts:
+            self._summary.info(
+                "%d Bot API requests succeeded in %.0fs: %s",
+                sum(counts.values()),
+                elapsed,
+                ", ".join(f"{method}={count}" for method, count in counts.most_common()),
+            )
+
+
+def setup_logging(level="INFO", json=True, summary_interval=60.0):
+    """Route every record through a queue to a background writer thread
+
+    Callers only format the message and enqueue it; a ``QueueListener``
+    thread does the formatting and stderr I/O. Call once per process (shard
+    workers included): a forked child does not inherit the listener thread.
+    """
+    global _listener, _listener_pid, _summaries
+    stop_logging()
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if json else RedactingFormatter(TEXT_FORMAT))
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    _summaries = SuccessSummaryFilter(summary_interval)
+    handler.addFilter(_summaries)
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener_pid = os.getpid()
+    _listener.start()
+
+
+@atexit.register
+def stop_logging():
+    """Log the pending summary and drain the queue; safe to call repeatedly"""
+    global _listener
+    if _listener is None or _listener_pid != os.getpid():
+        return
+    _summaries.summarize()
+    _listener.stop()
+    _listener = None
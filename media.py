@@ -0,0 +1,60 @@
+import asyncio
+import hashlib
+import os
+import logging
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCache:
+    """Uploads each photo once and reuses Telegram's file_id afterwards
+
+    File ids are keyed by the SHA-256 of the file content, so every worker
+    shares them through one Redis hash and an edited asset is uploaded again.
+    """
+
+    KEY = "media:file_ids"
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._files = {}  # path -> (stat signature, content hash, bytes)
+        self._file_ids = {}  # content hash -> file_id
+
+    async def _load(self, path):
+        # A changed mtime or size means the asset was edited and is hashed again
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._files.get(path)
+        if cached is None or cached[0] != signature:
+            with open(path, "rb") as fh:
+                data = await asyncio.to_thread(fh.read)
+            cached = self._files[path] = (signature, hashlib.sha256(data).hexdigest(), data)
+        return cached[1:]
+
+    async def _file_id(self, digest):
+        file_id = self._file_ids.get(digest)
+        if file_id is None:
+            file_id = await self.storage.client.hget(self.KEY, digest)
+            if file_id is not None:
+                file_id = self._file_ids[digest] = file_id.decode()
+        return file_id
+
+    async def send_photo(self, bot, chat_id, path, **kwargs):
+        """send_photo with the cached file_id of ``path``, uploading it when needed"""
+        digest, data = await self._load(path)
+        file_id = await self._file_id(digest)
+        if file_id is not None:
+            try:
+                return await bot.send_photo(chat_id, file_id, **kwargs)
+            except BadRequest as exc:
+                if "file" not in exc.message.lower():
+                    raise
+                logger.warning("Cached file_id for %s rejected (%s), re-uploading", path, exc.message)
+                self._file_ids.pop(digest, None)
+                await self.storage.client.hdel(self.KEY, digest)
+
+        message = await bot.send_photo(chat_id, data, filename=os.path.basename(path), **kwargs)
+        file_id = self._file_ids[digest] = message.photo[-1].file_id
+        await self.storage.client.hset(self.KEY, digest, file_id)
+        return message
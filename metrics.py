@@ -0,0 +1,131 @@
+import functools
+import logging
+import time
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, REGISTRY
+from telegram.ext import ApplicationHandlerStop
+
+logger = logging.getLogger(__name__)
+
+# Handlers mostly finish in milliseconds; the tail covers slow Bot API calls
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds", "Time spent in an update handler",
+    ["handler"], buckets=LATENCY_BUCKETS,
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Update handlers that raised", ["handler"]
+)
+HANDLER_IN_PROGRESS = Gauge(
+    "bot_handler_in_progress", "Update handlers currently running", ["handler"]
+)
+API_LATENCY = Histogram(
+    "bot_api_request_duration_seconds", "Bot API request time, excluding rate limit waits",
+    ["method"], buckets=LATENCY_BUCKETS,
+)
+API_ERRORS = Counter(
+    "bot_api_errors_total", "Failed Bot API requests", ["method", "error"]
+)
+REDIS_LATENCY = Histogram(
+    "bot_redis_command_duration_seconds", "Redis round trip time; pipelines count once",
+    ["command"], buckets=LATENCY_BUCKETS,
+)
+
+
+def instrument(callback, name=None):
+    """Wrap a handler callback to record its latency, errors and concurrency
+
+    ``ApplicationHandlerStop`` is flow control, not a failure, so it is not
+    counted as an error.
+    """
+    name = name or callback.__name__.lstrip("_")
+    latency = HANDLER_LATENCY.labels(name)
+    errors = HANDLER_ERRORS.labels(name)
+    in_progress = HANDLER_IN_PROGRESS.labels(name)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except ApplicationHandlerStop:
+            raise
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+            in_progress.dec()
+
+    return wrapper
+
+
+def instrument_application(application):
+    """Instrument every handler registered on ``application`` so far"""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = instrument(handler.callback)
+
+
+class CountersCollector:
+    """Exports a ``counters`` dict property as one labelled counter"""
+
+    def __init__(self, name, documentation, source, label="event"):
+        self.name = name
+        self.documentation = documentation
+        self.source = source
+        self.label = label
+
+    def collect(self):
+        family = CounterMetricFamily(self.name, self.documentation, labels=[self.label])
+        for key, value in self.source.counters.items():
+            family.add_metric([key], value)
+        yield family
+
+
+class MetricsServer:
+    """aiohttp server exposing the default registry on ``/metrics``
+
+    ``collectors`` are registered while the server runs.
+    """
+
+    def __init__(self, listen="127.0.0.1", port=9464, path="/metrics", collectors=()):
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.collectors = collectors
+        self._runner = None
+
+    def build_app(self):
+        app = web.Application()
+        app.router.add_get(self.path, self._handle_metrics)
+        return app
+
+    async def start(self):
+        for collector in self.collectors:
+            REGISTRY.register(collector)
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.listen, self.port).start()
+        except OSError as exc:
+            # Metrics are optional; a taken port must not keep the bot down
+            logger.error("Metrics disabled, cannot listen on %s:%d: %s", self.listen, self.port, exc)
+            return
+        logger.info("Metrics served on %s:%d%s", self.listen, self.port, self.path)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            for collector in self.collectors:
+                REGISTRY.unregister(collector)
+
+    async def _handle_metrics(self, request):
+        # generate_latest() is synchronous but only formats in-memory values
+        return web.Response(
+            body=generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST}
+        )
@@ -0,0 +1,167 @@
+import unicodedata
+from collections import OrderedDict, deque
+
+# Common character substitutions folded before matching
+_LEET = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "@": "a", "$": "s", "!": "i", "|": "i", "+": "t",
+})
+
+
+def normalize(text):
+    """Fold case, compatibility forms, accents and leetspeak"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.translate(_LEET)
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over normalized banned phrases
+
+    Adding a phrase extends the trie and removing one only clears its terminal
+    mark; failure links are recomputed lazily before the next search. A
+    search is a single pass over the message whatever the number of phrases.
+    """
+
+    def __init__(self, phrases=()):
+        self._reset()
+        for phrase in phrases:
+            self.add(phrase)
+
+    def _reset(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [None]  # phrase ending at the node, if any
+        self._hit = [False]  # node or one of its suffixes is terminal
+        self._phrases = set()
+        self._dead_nodes = 0
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._phrases)
+
+    def __contains__(self, phrase):
+        return normalize(phrase).strip() in self._phrases
+
+    @property
+    def phrases(self):
+        return sorted(self._phrases)
+
+    def add(self, phrase):
+        key = normalize(phrase).strip()
+        if not key or key in self._phrases:
+            return False
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._hit.append(False)
+            node = nxt
+        self._terminal[node] = key
+        self._phrases.add(key)
+        self._dirty = True
+        return True
+
+    def remove(self, phrase):
+        key = normalize(phrase).strip()
+        if key not in self._phrases:
+            return False
+        self._phrases.discard(key)
+        self._dead_nodes += len(key)
+        if self._dead_nodes > len(self._goto) // 2:
+            # Mostly dead trie: rebuilding is cheaper than scanning through it
+            phrases = self._phrases
+            self._reset()
+            for key in phrases:
+                self.add(key)
+            return True
+        node = 0
+        for ch in key:
+            node = self._goto[node][ch]
+        self._terminal[node] = None
+        self._dirty = True
+        return True
+
+    def _build_links(self):
+        goto, fail, terminal, hit = self._goto, self._fail, self._terminal, self._hit
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            hit[child] = terminal[child] is not None
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0)
+                hit[child] = terminal[child] is not None or hit[fail[child]]
+                queue.append(child)
+        self._dirty = False
+
+    def search(self, text):
+        """Return the first banned phrase found in ``text``, or None"""
+        if not self._phrases:
+            return None
+        if self._dirty:
+            self._build_links()
+        goto, fail, hit = self._goto, self._fail, self._hit
+        state = 0
+        for ch in normalize(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if hit[state]:
+                while self._terminal[state] is None:
+                    state = fail[state]
+                return self._terminal[state]
+        return None
+
+
+class PhraseStore:
+    """Per-chat banned phrases in Redis with compiled matchers cached in-process
+
+    Sharded workers see every update of a chat, so the local cache of the
+    worker owning a chat is also the only one that needs updating.
+    """
+
+    def __init__(self, storage, max_chats=10000):
+        self.storage = storage
+        self.max_chats = max_chats
+        self._matchers = OrderedDict()
+
+    @staticmethod
+    def _key(chat_id):
+        return f"phrases:{chat_id}"
+
+    async def matcher(self, chat_id):
+        matcher = self._matchers.get(chat_id)
+        if matcher is not None:
+            self._matchers.move_to_end(chat_id)
+            return matcher
+        members = await self.storage.client.smembers(self._key(chat_id))
+        matcher = PhraseMatcher(m.decode() for m in members)
+        self._matchers[chat_id] = matcher
+        if len(self._matchers) > self.max_chats:
+            self._matchers.popitem(last=False)
+        return matcher
+
+    async def add(self, chat_id, phrase):
+        matcher = await self.matcher(chat_id)
+        if not matcher.add(phrase):
+            return False
+        await self.storage.client.sadd(self._key(chat_id), normalize(phrase).strip())
+        return True
+
+    async def remove(self, chat_id, phrase):
+        matcher = await self.matcher(chat_id)
+        if not matcher.remove(phrase):
+            return False
+        await self.storage.client.srem(self._key(chat_id), normalize(phrase).strip())
+        return True
@@ -0,0 +1,51 @@
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates from different chats concurrently, one at a time per chat
+
+    ``max_concurrent_updates`` bounds how many handlers run at once. The base
+    class semaphore is sized by ``max_pending_updates`` instead, so updates
+    queued behind a busy chat do not take execution slots away from others.
+    """
+
+    def __init__(self, max_concurrent_updates, max_pending_updates=4096):
+        super().__init__(max(max_pending_updates, max_concurrent_updates))
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        # chat_id -> [lock, number of updates holding or waiting for it]
+        self._chat_locks = {}
+
+    async def do_process_update(self, update, coroutine):
+        chat_id = _chat_id(update)
+        if chat_id is None:
+            async with self._running:
+                await coroutine
+            return
+
+        entry = self._chat_locks.get(chat_id)
+        if entry is None:
+            entry = self._chat_locks[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, which keeps updates of
+            # the same chat in arrival order
+            async with entry[0], self._running:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[chat_id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        self._chat_locks.clear()
+
+
+def _chat_id(update):
+    if isinstance(update, Update) and update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
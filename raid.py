@@ -0,0 +1,53 @@
+import time
+from collections import deque
+
+
+class RaidDetector:
+    """Join-rate detector switching chats into a temporary raid mode
+
+    A chat enters raid mode when ``threshold`` members join within ``window``
+    seconds; those members are reported so they can be restricted too. Every
+    join during the raid pushes the end back to ``cooldown`` seconds after
+    the latest one.
+    """
+
+    def __init__(self, threshold, window, cooldown):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._joins = {}  # chat_id -> ring buffer of the last (join time, user_id)
+        self._raids = {}  # chat_id -> [ends_at, members joined during the raid]
+
+    def record_joins(self, chat_id, user_ids):
+        """Register joins; returns (in_raid, raid_just_started, earlier_ids)
+
+        When a raid starts, ``earlier_ids`` are the members of the detection
+        window who joined before this update and were let in unrestricted.
+        """
+        now = time.monotonic()
+        raid = self._raids.get(chat_id)
+        if raid is not None:
+            raid[0] = now + self.cooldown
+            raid[1] += len(user_ids)
+            return True, False, []
+
+        joins = self._joins.get(chat_id)
+        if joins is None:
+            joins = self._joins[chat_id] = deque(maxlen=self.threshold)
+        joins.extend((now, user_id) for user_id in user_ids[-self.threshold:])
+        if len(joins) == self.threshold and now - joins[0][0] < self.window:
+            del self._joins[chat_id]
+            self._raids[chat_id] = [now + self.cooldown, len(user_ids)]
+            current = set(user_ids)
+            return True, True, [user_id for _, user_id in joins if user_id not in current]
+        return False, False, []
+
+    def remaining(self, chat_id):
+        """Seconds until the raid in ``chat_id`` may end, 0 if it is over"""
+        raid = self._raids.get(chat_id)
+        return max(0.0, raid[0] - time.monotonic()) if raid else 0.0
+
+    def end(self, chat_id):
+        """Leave raid mode; returns how many members joined during the raid"""
+        raid = self._raids.pop(chat_id, None)
+        return raid[1] if raid else 0
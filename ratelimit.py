@@ -0,0 +1,184 @@
+import asyncio
+import enum
+import heapq
+import itertools
+import logging
+import time
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from metrics import API_ERRORS, API_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Endpoints throttled by the moderation bucket instead of the message buckets
+MODERATION_ENDPOINTS = frozenset({
+    "banChatMember", "unbanChatMember", "restrictChatMember", "promoteChatMember",
+    "banChatSenderChat", "unbanChatSenderChat", "deleteMessage", "deleteMessages",
+    "approveChatJoinRequest", "declineChatJoinRequest",
+})
+# Besides send* and edit*, these post messages and share the message limits
+MESSAGE_ENDPOINTS = frozenset({
+    "copyMessage", "copyMessages", "forwardMessage", "forwardMessages",
+})
+
+
+class Priority(enum.IntEnum):
+    """Order in which throttled requests are released; lower goes first"""
+    MODERATION = 0
+    INTERACTIVE = 1
+    BULK = 2
+
+
+class TokenBucket:
+    """Token bucket whose waiters are served by priority, then arrival order"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._drainer = None
+
+    @property
+    def idle(self):
+        """True when nobody waits and the bucket has refilled completely"""
+        if self._waiters:
+            return False
+        now = time.monotonic()
+        return self._tokens + (now - self._updated) * self.rate >= self.capacity
+
+    def pause(self, seconds):
+        """Hold every request for ``seconds``, e.g. after a 429 from Telegram"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _take(self):
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self, priority=Priority.INTERACTIVE):
+        if not self._waiters and self._take() == 0:
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.create_task(self._drain())
+        await future
+
+    async def _drain(self):
+        while self._waiters:
+            if self._waiters[0][2].done():  # cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._take()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            heapq.heappop(self._waiters)[2].set_result(None)
+
+
+class OutboundRateLimiter(BaseRateLimiter):
+    """Throttles Bot API calls with global, per-chat and moderation token buckets
+
+    Requests sending or editing messages in a chat take a token from that
+    chat's bucket and then from the global bucket; reads pass unthrottled.
+    Moderation endpoints use their own bucket, so bans and deletes are not
+    stuck behind queued welcome messages. Pass a
+    :class:`Priority` as ``rate_limit_args`` to override the default priority.
+    """
+
+    def __init__(self, global_rate=30, group_per_minute=20, private_rate=1,
+                 moderation_rate=30, max_retries=2):
+        self.global_rate = global_rate
+        self.group_per_minute = group_per_minute
+        self.private_rate = private_rate
+        self.moderation_rate = moderation_rate
+        self.max_retries = max_retries
+        self._global = None
+        self._moderation = None
+        self._chats = {}
+        self._requests = 0
+
+    async def initialize(self):
+        self._global = TokenBucket(self.global_rate, self.global_rate)
+        self._moderation = TokenBucket(self.moderation_rate, self.moderation_rate)
+
+    async def shutdown(self):
+        self._chats.clear()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if _is_group(chat_id):
+                bucket = TokenBucket(self.group_per_minute / 60, self.group_per_minute)
+            else:
+                bucket = TokenBucket(self.private_rate, self.private_rate)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _evict_idle(self):
+        for chat_id in [c for c, bucket in self._chats.items() if bucket.idle]:
+            del self._chats[chat_id]
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if endpoint in MODERATION_ENDPOINTS:
+            priority = Priority.MODERATION
+            buckets = (self._moderation,)
+        elif chat_id is not None and _is_message(endpoint):
+            priority = Priority.INTERACTIVE
+            buckets = (self._chat_bucket(chat_id), self._global)
+        else:
+            buckets = ()
+        if isinstance(rate_limit_args, int):
+            priority = Priority(rate_limit_args)
+
+        self._requests += 1
+        if self._requests % 1000 == 0:
+            self._evict_idle()
+
+        for attempt in range(self.max_retries + 1):
+            # Per-chat first, so a chat waiting out its own limit holds no global token
+            for bucket in buckets:
+                await bucket.acquire(priority)
+            try:
+                return await self._timed(callback, args, kwargs, endpoint)
+            except RetryAfter as exc:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning("%s hit flood control, retrying in %ss", endpoint, exc.retry_after)
+                if buckets:
+                    buckets[0].pause(exc.retry_after)
+                else:
+                    await asyncio.sleep(exc.retry_after)
+
+    @staticmethod
+    async def _timed(callback, args, kwargs, endpoint):
+        started = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception as exc:
+            API_ERRORS.labels(endpoint, type(exc).__name__).inc()
+            raise
+        finally:
+            API_LATENCY.labels(endpoint).observe(time.perf_counter() - started)
+
+
+def _is_message(endpoint):
+    # Reads such as getChatAdministrators are not limited like messages
+    return endpoint.startswith(("send", "edit")) or endpoint in MESSAGE_ENDPOINTS
+
+
+def _is_group(chat_id):
+    # Group and supergroup ids are negative; public @usernames are groups/channels
+    return isinstance(chat_id, str) or chat_id < 0
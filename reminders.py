@@ -0,0 +1,160 @@
+import html
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from welcome import MAX_MESSAGE_LENGTH
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "homework-reminders"
+
+DUE_BETWEEN_SQL = (
+    "SELECT chat_id, subject, description, due_at FROM homework "
+    "WHERE due_at > ? AND due_at <= ? AND id <= ? ORDER BY chat_id, due_at"
+)
+# Homework added after its reminder time had already passed, but not yet due
+ADDED_LATE_SQL = (
+    "SELECT chat_id, subject, description, due_at FROM homework "
+    "WHERE id > ? AND id <= ? AND due_at > ? AND due_at <= ? ORDER BY chat_id, due_at"
+)
+LAST_ID_SQL = "SELECT COALESCE(MAX(id), 0) FROM homework"
+NEXT_DUE_SQL = "SELECT MIN(due_at) FROM homework WHERE due_at > ?"
+STATE_SQL = "SELECT name, value FROM scheduler_state WHERE name IN ('reminders', 'reminders_last_id')"
+SET_STATE_SQL = (
+    "INSERT INTO scheduler_state (name, value) VALUES (?, ?) "
+    "ON CONFLICT (name) DO UPDATE SET value = excluded.value"
+)
+
+
+class ReminderScheduler:
+    """Homework reminders driven by one JobQueue job
+
+    The due-date index of the homework table is the schedule: the job sleeps
+    until the next reminder time, sends every reminder falling into that
+    minute as one message per chat, records how far it got (the watermark)
+    and re-arms itself for the following deadline.
+
+    Homework added after its reminder time is reminded on the next run, found
+    by its id being above the last one the scheduler has seen.
+    """
+
+    def __init__(self, db, job_queue, send, lead_time=86400, resync=900):
+        self.db = db
+        self.job_queue = job_queue
+        self.send = send  # async send(chat_id, html_text)
+        self.lead_time = lead_time
+        self.resync = resync  # longest sleep, to see homework added by other processes
+        self._watermark = None  # reminders up to this epoch second have been sent
+        self._last_id = None  # homework up to this id has been considered
+        self._job = None
+        self._armed_at = None
+
+    async def start(self):
+        state = {row["name"]: row["value"] for row in await self.db.fetchall(STATE_SQL)}
+        self._watermark = state.get("reminders")
+        self._last_id = state.get("reminders_last_id")
+        if self._watermark is None:
+            # First run: start from now rather than reminding about the past
+            self._watermark = int(time.time())
+            await self.db.execute(SET_STATE_SQL, ("reminders", self._watermark))
+        if self._last_id is None:
+            self._last_id = (await self.db.fetchone(LAST_ID_SQL))[0]
+            await self.db.execute(SET_STATE_SQL, ("reminders_last_id", self._last_id))
+        await self._arm()
+
+    def stop(self):
+        if self._job is not None:
+            self._job.schedule_removal()
+            self._job = None
+
+    async def notify(self, due_at):
+        """Re-arm early when new homework needs a reminder before the armed time
+
+        Homework whose reminder time has already passed runs the job now.
+        """
+        remind_at = due_at - self.lead_time
+        if self._watermark is not None and due_at > time.time() and (
+            self._armed_at is None or remind_at < self._armed_at
+        ):
+            self._schedule(remind_at)
+
+    async def _arm(self):
+        row = await self.db.fetchone(NEXT_DUE_SQL, (self._watermark + self.lead_time,))
+        next_due = row[0] if row else None
+        self._schedule(next_due - self.lead_time if next_due is not None else None)
+
+    def _schedule(self, remind_at):
+        now = time.time()
+        wake = now + self.resync if remind_at is None else min(remind_at, now + self.resync)
+        self.stop()
+        self._armed_at = wake
+        self._job = self.job_queue.run_once(self._run, max(0.0, wake - now), name=JOB_NAME)
+
+    async def _run(self, context):
+        self._job = None
+        self._armed_at = None
+        # Everything due to be reminded before the end of the current minute
+        until = (int(time.time()) // 60 + 1) * 60
+        try:
+            await self._send_batch(max(until, self._watermark))
+        finally:
+            await self._arm()
+
+    async def _send_batch(self, until):
+        last_id = (await self.db.fetchone(LAST_ID_SQL))[0]
+        rows = await self.db.fetchall(
+            DUE_BETWEEN_SQL, (self._watermark + self.lead_time, until + self.lead_time, last_id)
+        )
+        rows += await self.db.fetchall(
+            ADDED_LATE_SQL,
+            (self._last_id, last_id, int(time.time()), self._watermark + self.lead_time),
+        )
+        by_chat = defaultdict(list)
+        for row in rows:
+            by_chat[row["chat_id"]].append(row)
+
+        for chat_id, items in by_chat.items():
+            items.sort(key=lambda row: row["due_at"])
+            for text in render_reminders(items):
+                try:
+                    await self.send(chat_id, text)
+                except Exception:
+                    logger.exception("Could not send homework reminder to %s", chat_id)
+
+        self._watermark = until
+        self._last_id = last_id
+        await self.db.executemany(
+            SET_STATE_SQL, [("reminders", until), ("reminders_last_id", last_id)]
+        )
+        if rows:
+            logger.info("Sent %d homework reminders to %d chats", len(rows), len(by_chat))
+
+
+def render_reminders(items, max_length=MAX_MESSAGE_LENGTH):
+    """Split a chat's reminders into messages within Telegram's length limit"""
+    head = "⏰ Homework due soon:"
+    chunk, length = [head], len(head)
+    for row in items:
+        due = f"{datetime.fromtimestamp(row['due_at'], timezone.utc):%Y-%m-%d %H:%M}"
+        # Even an overlong subject leaves some room for the description
+        subject = _shorten(row["subject"], (max_length - len(head)) // 2)
+        line = f"• <b>{subject}</b> (due {due} UTC): "
+        line += _shorten(row["description"], max(1, max_length - len(head) - len(line) - 1))
+        if len(chunk) > 1 and length + 1 + len(line) > max_length:
+            yield "\n".join(chunk)
+            chunk, length = [head], len(head)
+        chunk.append(line)
+        length += 1 + len(line)
+    if len(chunk) > 1:
+        yield "\n".join(chunk)
+
+
+def _shorten(value, room):
+    # Cut before escaping, so no entity is split; always ends, even if the
+    # ellipsis alone does not fit
+    text = html.escape(value)
+    while len(text) > room and value:
+        value = value[:min(len(value) - 1, len(value) * room // len(text))]
+        text = html.escape(value) + "…"
+    return text
@@ -0,0 +1,105 @@
+import asyncio
+import html
+import logging
+from collections import OrderedDict
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "rules:invalidate"
+# Longest wait for an invalidation; the pool's health checks run between waits
+POLL_SECONDS = 5.0
+
+
+def render_rules(text):
+    """Pre-render rules text as numbered, escaped HTML"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    body = "\n".join(f"{i}. {html.escape(line)}" for i, line in enumerate(lines, 1))
+    return f"📜 <b>Rules</b>\n{body}"
+
+
+class RulesStore:
+    """Per-chat rules in Redis, served from an in-process LRU cache
+
+    Each chat's rules carry a version that is bumped on every change. Writers
+    publish ``chat_id:version`` on a pub/sub channel and every process drops
+    cached copies older than that version, so ``/rules`` normally needs no
+    Redis round trip at all.
+    """
+
+    def __init__(self, storage, max_chats=10000):
+        self.storage = storage
+        self.max_chats = max_chats
+        self._cache = OrderedDict()  # chat_id -> (version, html or None)
+        self._listener = None
+
+    @staticmethod
+    def _key(chat_id):
+        return f"rules:{chat_id}"
+
+    def _remember(self, chat_id, version, rendered):
+        self._cache[chat_id] = (version, rendered)
+        self._cache.move_to_end(chat_id)
+        if len(self._cache) > self.max_chats:
+            self._cache.popitem(last=False)
+
+    async def get(self, chat_id):
+        """Rendered rules HTML of the chat, or None if none were set"""
+        cached = self._cache.get(chat_id)
+        if cached is not None:
+            self._cache.move_to_end(chat_id)
+            return cached[1]
+        stored = await self.storage.client.hmget(self._key(chat_id), "version", "html")
+        version = int(stored[0] or 0)
+        rendered = stored[1].decode() if stored[1] is not None else None
+        self._remember(chat_id, version, rendered)
+        return rendered
+
+    async def set(self, chat_id, text):
+        rendered = render_rules(text)
+        async with self.storage.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(chat_id), "html", rendered)
+            pipe.hincrby(self._key(chat_id), "version", 1)
+            _, version = await pipe.execute()
+        self._remember(chat_id, version, rendered)
+        await self.storage.client.publish(CHANNEL, f"{chat_id}:{version}")
+        return rendered
+
+    def _invalidate(self, payload):
+        chat_id, version = (int(part) for part in payload.decode().rsplit(":", 1))
+        cached = self._cache.get(chat_id)
+        if cached is not None and cached[0] < version:
+            del self._cache[chat_id]
+
+    async def start(self):
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        while True:
+            pubsub = self.storage.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CHANNEL)
+                while True:
+                    # A bounded wait returns None on a quiet channel, where
+                    # listen() would hit the pool's socket_timeout and raise
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=POLL_SECONDS
+                    )
+                    if message is not None and message["type"] == "message":
+                        self._invalidate(message["data"])
+            except RedisError as exc:
+                logger.warning("Rules invalidation feed lost (%s), resubscribing", exc)
+                # Invalidations may have been missed while disconnected
+                self._cache.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+import threading
+from telegram import Bot
+from telegram.error import NetworkError, TelegramError
+
+logger = logging.getLogger(__name__)
+
+# Update fields carrying the chat an update belongs to, in lookup order
+_CHAT_FIELDS = (
+    "message", "edited_message", "channel_post", "edited_channel_post",
+    "my_chat_member", "chat_member", "chat_join_request",
+    "message_reaction", "message_reaction_count", "chat_boost", "removed_chat_boost",
+)
+
+
+def jump_hash(key, buckets):
+    """Jump consistent hash (Lamping & Veach); stable across processes and runs"""
+    # splitmix64 finalizer: jump hash needs well-mixed keys, chat ids are not
+    key &= 0xFFFFFFFFFFFFFFFF
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    key ^= key >> 31
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def shard_key(data):
+    """Routing key of a raw update dict: its chat id, else its sender, else update_id"""
+    for field in _CHAT_FIELDS:
+        obj = data.get(field)
+        if obj and "chat" in obj:
+            return obj["chat"]["id"]
+    callback = data.get("callback_query")
+    if callback and "message" in callback:
+        return callback["message"]["chat"]["id"]
+    for obj in data.values():
+        if isinstance(obj, dict) and "from" in obj:
+            return obj["from"]["id"]
+    return data.get("update_id", 0)
+
+
+class QueueIngress:
+    """Feeds updates routed to this worker from the supervisor's IPC queue"""
+
+    def __init__(self, queue, sink, closed):
+        self.queue = queue
+        self.sink = sink
+        self.closed = closed
+        self._loop = None
+        self._thread = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._pump, name="shard-ingress", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        pass
+
+    def _pump(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                self._loop.call_soon_threadsafe(self.closed.set)
+                return
+            # Waiting for each hand-off keeps the per-chat arrival order
+            asyncio.run_coroutine_threadsafe(self.sink(data), self._loop).result()
+
+
+class ShardSupervisor:
+    """Runs one ingress and N worker processes, routing updates by chat_id
+
+    ``worker_target(index, queue)`` is started in each child process. All
+    updates of a chat land on the same worker, so per-chat ordering holds.
+    """
+
+    def __init__(self, worker_target, workers):
+        self.worker_target = worker_target
+        self.workers = workers
+        self._queues = []
+        self._processes = []
+
+    def _spawn(self, index):
+        process = multiprocessing.Process(
+            target=self.worker_target,
+            args=(index, self._queues[index]),
+            name=f"shard-{index}",
+            daemon=False,
+        )
+        process.start()
+        logger.info("Started shard worker %d (pid %d)", index, process.pid)
+        return process
+
+    def start_workers(self):
+        self._queues = [multiprocessing.Queue() for _ in range(self.workers)]
+        self._processes = [self._spawn(i) for i in range(self.workers)]
+
+    def stop_workers(self, timeout=10):
+        for queue in self._queues:
+            queue.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                # Workers ignore SIGTERM during the drain, so only SIGKILL stops them
+                logger.warning("Shard worker %s did not exit, killing it", process.name)
+                process.kill()
+                process.join()
+
+    async def route(self, data: dict):
+        """Ingress sink: forward a raw update to its worker"""
+        self._queues[jump_hash(shard_key(data), self.workers)].put(data)
+
+    async def _watch_workers(self):
+        while True:
+            await asyncio.sleep(1)
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    logger.error("Shard worker %d exited with %s, restarting", index, process.exitcode)
+                    self._processes[index] = self._spawn(index)
+
+    async def run(self, ingress):
+        """Start ``ingress`` (anything with async start/stop) and block until signalled"""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        watcher = asyncio.create_task(self._watch_workers())
+        await ingress.start()
+        try:
+            await stop.wait()
+        finally:
+            watcher.cancel()
+            await ingress.stop()
+
+
+class PollingIngress:
+    """Long-polls getUpdates and hands each update to ``sink`` as a raw dict"""
+
+    def __init__(self, token, sink, timeout=10, allowed_updates=None):
+        self.bot = Bot(token)
+        self.sink = sink
+        self.timeout = timeout
+        self.allowed_updates = allowed_updates
+        self._offset = None  # update_id after the last routed update
+        self._task = None
+
+    async def start(self):
+        await self.bot.initialize()
+        await self.bot.delete_webhook()
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._offset is not None:
+            # Confirm the last routed batch, or Telegram redelivers it on restart
+            try:
+                await self.bot.get_updates(offset=self._offset, timeout=0)
+            except TelegramError as exc:
+                logger.warning("Could not confirm updates up to %d: %s", self._offset, exc)
+        await self.bot.shutdown()
+
+    async def _poll(self):
+        while True:
+            try:
+                updates = await self.bot.get_updates(
+                    offset=self._offset,
+                    timeout=self.timeout,
+                    read_timeout=self.timeout + 5,
+                    allowed_updates=self.allowed_updates,
+                )
+            except NetworkError as exc:
+                logger.warning("getUpdates failed: %s", exc)
+                await asyncio.sleep(1)
+                continue
+            except TelegramError:
+                logger.exception("getUpdates failed")
+                await asyncio.sleep(5)
+                continue
+            for update in updates:
+                await self.sink(update.to_dict())
+                self._offset = update.update_id + 1
@@ -0,0 +1,289 @@
+import logging
+import time
+import redis.asyncio as aioredis
+from redis.exceptions import NoScriptError
+from metrics import REDIS_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Lua scripts loaded into the server script cache when the pool opens.
+# Running the whole read-modify-write server side makes it atomic and costs a
+# single round trip.
+SCRIPTS = {
+    # KEYS[1] = sorted set of warning timestamps (ms)
+    # ARGV[1] = max warnings, ARGV[2] = now (ms), ARGV[3] = decay (ms, 0 = never),
+    # ARGV[4] = unique member for this warning
+    # Returns {count, escalate}; the warnings are cleared when escalating
+    "warn": """
+local now, decay = tonumber(ARGV[2]), tonumber(ARGV[3])
+if redis.call('TYPE', KEYS[1]).ok == 'string' then
+    -- Legacy INCR counter: convert it, its warnings start decaying now
+    local legacy = tonumber(redis.call('GET', KEYS[1])) or 0
+    redis.call('DEL', KEYS[1])
+    for i = 1, legacy do
+        redis.call('ZADD', KEYS[1], now, 'legacy:' .. i)
+    end
+end
+if decay > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - decay)
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+local count = redis.call('ZCARD', KEYS[1])
+if count >= tonumber(ARGV[1]) then
+    redis.call('DEL', KEYS[1])
+    return {count, 1}
+end
+if decay > 0 then
+    redis.call('PEXPIRE', KEYS[1], decay)
+end
+return {count, 0}
+""",
+    # KEYS[1] = sorted set of warning timestamps, ARGV[1] = now (ms), ARGV[2] = decay (ms)
+    # Returns the number of live warnings
+    "warn_count": """
+local kind = redis.call('TYPE', KEYS[1]).ok
+if kind == 'string' then
+    return tonumber(redis.call('GET', KEYS[1]))
+elseif kind ~= 'zset' then
+    return 0
+end
+local decay = tonumber(ARGV[2])
+if decay > 0 then
+    -- Exclusive bound: warn drops warnings exactly ``decay`` old
+    return redis.call('ZCOUNT', KEYS[1], '(' .. (tonumber(ARGV[1]) - decay), '+inf')
+end
+return redis.call('ZCARD', KEYS[1])
+""",
+    # KEYS[1] = sorted set of warning timestamps, ARGV[1] = count,
+    # ARGV[2] = warned at (ms), ARGV[3] = decay (ms)
+    # Restores warnings unless the key already exists; returns 1 if restored
+    "warn_restore": """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+for i = 1, tonumber(ARGV[1]) do
+    redis.call('ZADD', KEYS[1], ARGV[2], 'restored:' .. i)
+end
+local decay = tonumber(ARGV[3])
+if decay > 0 then
+    redis.call('PEXPIREAT', KEYS[1], tonumber(ARGV[2]) + decay)
+end
+return 1
+""",
+    # Hash layout: one hash per chat, field = user id, value = comma separated
+    # warning timestamps (s), oldest first
+    # KEYS[1] = chat hash, ARGV[1] = user id, ARGV[2] = max warnings,
+    # ARGV[3] = now (s), ARGV[4] = decay (s, 0 = never)
+    # Returns {count, escalate}; the user's warnings are cleared when escalating
+    "warn_hash": """
+local now, decay = tonumber(ARGV[3]), tonumber(ARGV[4])
+local kept = {}
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current then
+    for ts in string.gmatch(current, '%d+') do
+        if decay == 0 or tonumber(ts) > now - decay then
+            kept[#kept + 1] = ts
+        end
+    end
+end
+kept[#kept + 1] = ARGV[3]
+local count = #kept
+local escalate = 0
+if count >= tonumber(ARGV[2]) then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    escalate = 1
+else
+    redis.call('HSET', KEYS[1], ARGV[1], table.concat(kept, ','))
+end
+if decay > 0 then
+    -- Sampled cleanup of users whose newest warning has decayed
+    local sample = redis.call('HRANDFIELD', KEYS[1], 8, 'WITHVALUES')
+    for i = 1, #sample, 2 do
+        if tonumber(string.match(sample[i + 1], '(%d+)$')) <= now - decay then
+            redis.call('HDEL', KEYS[1], sample[i])
+        end
+    end
+    -- This is the newest warning in the chat, so the hash outlives all others
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        redis.call('EXPIRE', KEYS[1], decay)
+    end
+end
+return {count, escalate}
+""",
+    # KEYS[1] = chat hash, ARGV[1] = user id, ARGV[2] = now (s), ARGV[3] = decay (s)
+    # Returns the number of live warnings
+    "warn_hash_count": """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current then
+    return 0
+end
+local cutoff = tonumber(ARGV[2]) - tonumber(ARGV[3])
+local count = 0
+for ts in string.gmatch(current, '%d+') do
+    if ARGV[3] == '0' or tonumber(ts) > cutoff then
+        count = count + 1
+    end
+end
+return count
+""",
+    # KEYS[1] = chat hash, ARGV[1] = user id, ARGV[2] = count,
+    # ARGV[3] = warned at (s), ARGV[4] = decay (s), ARGV[5] = now (s)
+    # Restores warnings unless the user already has some; returns 1 if restored
+    "warn_hash_restore": """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+    return 0
+end
+local stamps = {}
+for i = 1, tonumber(ARGV[2]) do
+    stamps[i] = ARGV[3]
+end
+redis.call('HSET', KEYS[1], ARGV[1], table.concat(stamps, ','))
+local decay = tonumber(ARGV[4])
+if decay > 0 then
+    local ttl = tonumber(ARGV[3]) + decay - tonumber(ARGV[5])
+    if redis.call('TTL', KEYS[1]) < ttl then
+        redis.call('EXPIRE', KEYS[1], ttl)
+    end
+end
+return 1
+""",
+    # KEYS[1] = timestamp list, ARGV[1] = now (ms), ARGV[2] = limit, ARGV[3] = window (ms)
+    # Returns 1 when the last `limit` messages fit inside the window
+    "flood": """
+local limit = tonumber(ARGV[2])
+redis.call('LPUSH', KEYS[1], ARGV[1])
+redis.call('LTRIM', KEYS[1], 0, limit - 1)
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+if redis.call('LLEN', KEYS[1]) < limit then
+    return 0
+end
+if tonumber(ARGV[1]) - tonumber(redis.call('LINDEX', KEYS[1], -1)) < tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+""",
+    # KEYS[1] = leaderboard set, KEYS[2] = rebuild journal, KEYS[3] = names hash
+    # ARGV[1] = user id, ARGV[2] = delta, ARGV[3] = username ('' = keep),
+    # ARGV[4] = '1' to journal even before the journal exists
+    # Returns the new score; deltas are journaled while a rebuild runs
+    "leaderboard_add": """
+local score = redis.call('ZINCRBY', KEYS[1], ARGV[2], ARGV[1])
+if ARGV[4] == '1' or redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('HINCRBY', KEYS[2], ARGV[1], ARGV[2])
+end
+if ARGV[3] ~= '' then
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+end
+return score
+""",
+    # KEYS[1] = staging set, KEYS[2] = leaderboard set, KEYS[3] = rebuild journal
+    # Replays journaled deltas onto the staging set, then swaps it in
+    "leaderboard_swap": """
+local journal = redis.call('HGETALL', KEYS[3])
+local replayed = 0
+for i = 1, #journal, 2 do
+    if journal[i] ~= '' then
+        redis.call('ZINCRBY', KEYS[1], journal[i + 1], journal[i])
+        replayed = replayed + 1
+    end
+end
+redis.call('DEL', KEYS[3])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+else
+    redis.call('DEL', KEYS[2])
+end
+return replayed
+""",
+}
+
+
+class TimedRedis(aioredis.Redis):
+    """Redis client recording the latency of every command it sends"""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class TimedPipeline(aioredis.client.Pipeline):
+    """Pipeline recording one round trip per execute()"""
+
+    async def execute(self, raise_on_error=True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            command = "MULTI" if self.is_transaction else "PIPELINE"
+            REDIS_LATENCY.labels(command).observe(time.perf_counter() - started)
+
+
+class RedisStorage:
+    """Async Redis client backed by a bounded connection pool"""
+
+    def __init__(self, url, max_connections=50, pool_timeout=5.0, socket_timeout=5.0):
+        self.url = url
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.socket_timeout = socket_timeout
+        self._pool = None
+        self._client = None
+        self._script_shas = {}
+
+    @property
+    def client(self):
+        """Shared redis.asyncio client; only valid between open() and close()"""
+        if self._client is None:
+            raise RuntimeError("RedisStorage is not open")
+        return self._client
+
+    async def open(self):
+        """Create the connection pool and verify the server is reachable"""
+        if self._client is not None:
+            return
+        # A blocking pool makes callers wait for a free connection instead of
+        # opening an unbounded number of sockets during update bursts
+        self._pool = aioredis.BlockingConnectionPool.from_url(
+            self.url,
+            max_connections=self.max_connections,
+            timeout=self.pool_timeout,
+            socket_timeout=self.socket_timeout,
+            socket_connect_timeout=self.socket_timeout,
+            health_check_interval=30,
+        )
+        self._client = TimedRedis(connection_pool=self._pool)
+        await self._client.ping()
+        await self._load_scripts()
+        logger.info("Redis pool opened (max %d connections)", self.max_connections)
+
+    async def close(self):
+        """Release every pooled connection"""
+        if self._client is None:
+            return
+        await self._client.close()
+        await self._pool.disconnect()
+        self._client = None
+        self._pool = None
+        logger.info("Redis pool closed")
+
+    async def _load_scripts(self):
+        for name, source in SCRIPTS.items():
+            self._script_shas[name] = await self._client.script_load(source)
+
+    async def run_script(self, name, keys=(), args=()):
+        """EVALSHA a preloaded script, reloading it if the script cache was flushed"""
+        sha = self._script_shas.get(name)
+        if sha is not None:
+            try:
+                return await self.client.evalsha(sha, len(keys), *keys, *args)
+            except NoScriptError:
+                logger.warning("Script %r missing from Redis cache, reloading", name)
+        self._script_shas[name] = await self.client.script_load(SCRIPTS[name])
+        return await self.client.evalsha(self._script_shas[name], len(keys), *keys, *args)
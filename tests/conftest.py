@@ -0,0 +1,27 @@
+import asyncio
+import os
+import sys
+
+import fakeredis.aioredis
+import pytest
+
+# The bot is a set of flat modules next to bot.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from storage import RedisStorage  # noqa: E402
+
+
+@pytest.fixture
+def with_storage():
+    """Run ``scenario(storage)`` against a RedisStorage backed by fakeredis"""
+    def run(scenario):
+        async def main():
+            storage = RedisStorage("redis://fakeredis")
+            storage._client = fakeredis.aioredis.FakeRedis()
+            await storage._load_scripts()
+            try:
+                await scenario(storage)
+            finally:
+                await storage._client.close()
+        asyncio.run(main())
+    return run
@@ -0,0 +1,39 @@
+import asyncio
+
+from flood import LocalFloodDetector
+
+KEY = "flood:-100:42"
+
+
+async def hit(storage, now, limit=3, window=1000):
+    return await storage.run_script("flood", keys=(KEY,), args=(now, limit, window))
+
+
+def test_limit_messages_inside_the_window_flood(with_storage):
+    async def scenario(storage):
+        assert await hit(storage, 0) == 0
+        assert await hit(storage, 100) == 0
+        assert await hit(storage, 999) == 1
+        # The buffer starts over after a trigger
+        assert not await storage.client.exists(KEY)
+        assert await hit(storage, 1000) == 0
+    with_storage(scenario)
+
+
+def test_spread_out_messages_do_not_flood(with_storage):
+    async def scenario(storage):
+        for now in (0, 500, 1000, 1500, 2000):
+            assert await hit(storage, now) == 0
+        # Only the last `limit` timestamps are kept
+        assert await storage.client.llen(KEY) == 3
+        assert 0 < await storage.client.pttl(KEY) <= 1000
+    with_storage(scenario)
+
+
+def test_local_detector_matches_the_script():
+    async def scenario():
+        detector = LocalFloodDetector(limit=3, window=60)
+        assert [await detector.hit(-100, 42) for _ in range(3)] == [False, False, True]
+        assert await detector.hit(-100, 42) is False
+        assert await detector.hit(-100, 7) is False
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+import sqlite3
+import threading
+
+from database import MIGRATIONS, migrate
+
+
+def test_concurrent_migrations_apply_once(tmp_path):
+    path = str(tmp_path / "bot.db")
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def shard():
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        try:
+            barrier.wait()
+            migrate(conn)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=shard) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    conn.close()
+
+
+def test_migrate_is_a_no_op_when_current(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "bot.db"), isolation_level=None)
+    assert migrate(conn) == len(MIGRATIONS)
+    assert migrate(conn) == len(MIGRATIONS)
+    conn.close()
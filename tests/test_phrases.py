@@ -0,0 +1,57 @@
+import random
+
+from phrases import PhraseMatcher, normalize
+
+
+def naive_search(phrases, text):
+    text = normalize(text)
+    return {phrase for phrase in phrases if phrase in text}
+
+
+def test_normalize_folds_case_accents_and_leetspeak():
+    assert normalize("FRÉE M0N3Y") == "free money"
+
+
+def test_finds_phrases_anywhere_in_the_text():
+    matcher = PhraseMatcher(["spam", "buy now", "pam"])
+    assert matcher.search("Please BUY N0W!") == "buy now"
+    assert matcher.search("no spаm here") is None  # Cyrillic а is not folded
+    assert matcher.search("xxspamxx") in {"spam", "pam"}
+    assert matcher.search("") is None
+
+
+def test_suffix_phrase_found_through_failure_links():
+    matcher = PhraseMatcher(["abcd", "bc"])
+    assert matcher.search("zabcz") == "bc"
+
+
+def test_add_and_remove_rebuild_the_automaton():
+    matcher = PhraseMatcher(["spam"])
+    assert matcher.search("spam") == "spam"
+    assert not matcher.add("SPAM")
+    assert matcher.add("scam")
+    assert matcher.search("a scam") == "scam"
+    assert matcher.remove("spam")
+    assert not matcher.remove("spam")
+    assert matcher.search("spam") is None
+    assert matcher.phrases == ["scam"]
+    assert "Scam" in matcher and len(matcher) == 1
+
+
+def test_random_add_remove_matches_naive_search():
+    rng = random.Random(1)
+    alphabet = "abc"
+    matcher = PhraseMatcher()
+    phrases = set()
+    for _ in range(500):
+        phrase = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+        if phrase in phrases and rng.random() < 0.5:
+            assert matcher.remove(phrase)
+            phrases.discard(phrase)
+        elif phrase not in phrases:
+            assert matcher.add(phrase)
+            phrases.add(phrase)
+        text = "".join(rng.choice(alphabet + "x") for _ in range(12))
+        expected = naive_search(phrases, text)
+        found = matcher.search(text)
+        assert found in expected if expected else found is None
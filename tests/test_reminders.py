@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from database import Database
+from reminders import ReminderScheduler, render_reminders
+
+INSERT_SQL = "INSERT INTO homework (chat_id, subject, description, due_at) VALUES (?, ?, ?, ?)"
+
+
+def row(subject="Maths", description="Exercise 1", due_at=1_700_000_000, chat_id=1):
+    return {"chat_id": chat_id, "subject": subject, "description": description, "due_at": due_at}
+
+
+def test_render_one_message_for_few_reminders():
+    texts = list(render_reminders([row(), row(subject="Physics")]))
+    assert len(texts) == 1
+    assert "<b>Maths</b>" in texts[0] and "<b>Physics</b>" in texts[0]
+
+
+def test_render_splits_at_the_length_limit():
+    texts = list(render_reminders([row(description="x" * 1000) for _ in range(10)]))
+    assert len(texts) > 1
+    assert all(len(text) <= 4096 for text in texts)
+    assert sum(text.count("<b>Maths</b>") for text in texts) == 10
+
+
+def test_render_truncates_without_splitting_entities():
+    (text,) = render_reminders([row(description="&" * 5000)])
+    assert len(text) <= 4096
+    assert text.endswith("&amp;…")
+
+
+def test_render_overlong_subject_terminates():
+    texts = list(render_reminders([row(subject="&" * 900, description="&" * 900)]))
+    assert len(texts) == 1 and len(texts[0]) <= 4096
+    texts = list(render_reminders([row(subject="&" * 5000)], max_length=100))
+    assert len(texts) == 1 and len(texts[0]) <= 100
+
+
+class FakeJob:
+    def __init__(self, when):
+        self.when = when
+        self.removed = False
+
+    def schedule_removal(self):
+        self.removed = True
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def run_once(self, callback, when, name=None):
+        self.jobs.append(FakeJob(when))
+        return self.jobs[-1]
+
+
+def with_scheduler(tmp_path, scenario):
+    async def main():
+        db = Database(str(tmp_path / "bot.db"), readers=1)
+        await db.open()
+        sent = []
+
+        async def send(chat_id, text):
+            sent.append((chat_id, text))
+
+        scheduler = ReminderScheduler(db, FakeJobQueue(), send, lead_time=86400)
+        try:
+            await scenario(db, scheduler, sent)
+        finally:
+            await db.close()
+    asyncio.run(main())
+
+
+def test_homework_added_late_is_reminded_once(tmp_path):
+    async def scenario(db, scheduler, sent):
+        await scheduler.start()
+        now = int(time.time())
+        await db.execute(INSERT_SQL, (1, "Maths", "Late", now + 3600))
+        await db.execute(INSERT_SQL, (1, "History", "Overdue", now - 60))
+        await scheduler.notify(now + 3600)
+        assert scheduler.job_queue.jobs[-1].when == 0.0
+
+        await scheduler._run(None)
+        assert len(sent) == 1
+        assert "Maths" in sent[0][1] and "History" not in sent[0][1]
+
+        await scheduler._run(None)
+        assert len(sent) == 1
+    with_scheduler(tmp_path, scenario)
+
+
+def test_homework_present_at_first_start_is_not_reminded_late(tmp_path):
+    async def scenario(db, scheduler, sent):
+        await db.execute(INSERT_SQL, (1, "Maths", "Old", int(time.time()) + 3600))
+        await scheduler.start()
+        await scheduler._run(None)
+        assert sent == []
+    with_scheduler(tmp_path, scenario)
+
+
+def test_watermark_and_last_id_survive_restart(tmp_path):
+    async def scenario(db, scheduler, sent):
+        await scheduler.start()
+        await db.execute(INSERT_SQL, (1, "Maths", "Late", int(time.time()) + 3600))
+        await scheduler._run(None)
+        assert len(sent) == 1
+
+        restarted = ReminderScheduler(db, FakeJobQueue(), scheduler.send, lead_time=86400)
+        await restarted.start()
+        assert restarted._watermark == scheduler._watermark
+        assert restarted._last_id == scheduler._last_id == 1
+        await restarted._run(None)
+        assert len(sent) == 1
+    with_scheduler(tmp_path, scenario)
+
+
+def test_reminder_sent_when_its_time_comes(tmp_path):
+    async def scenario(db, scheduler, sent):
+        await scheduler.start()
+        # Already present when the watermark was set, reminded by due date
+        scheduler._watermark -= 120
+        await db.execute(INSERT_SQL, (2, "Biology", "Essay", scheduler._watermark + 86400 + 60))
+        scheduler._last_id = 1
+        await scheduler._run(None)
+        assert [chat_id for chat_id, _ in sent] == [2]
+    with_scheduler(tmp_path, scenario)
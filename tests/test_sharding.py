@@ -0,0 +1,43 @@
+import signal
+import time
+from collections import Counter
+
+from sharding import ShardSupervisor, jump_hash, shard_key
+
+
+def test_jump_hash_is_stable_and_in_range():
+    for key in (-1001234567890, -1, 0, 1, 123456789):
+        bucket = jump_hash(key, 4)
+        assert 0 <= bucket < 4
+        assert jump_hash(key, 4) == bucket
+    assert jump_hash(-1001234567890, 1) == 0
+
+
+def test_jump_hash_spreads_sequential_chat_ids():
+    counts = Counter(jump_hash(-1000000000000 - i, 4) for i in range(4000))
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > 800
+
+
+def test_growing_the_pool_only_moves_keys_to_the_new_bucket():
+    for key in range(-5000, 5000, 7):
+        before, after = jump_hash(key, 4), jump_hash(key, 5)
+        assert after == before or after == 4
+
+
+def test_shard_key_prefers_the_chat():
+    assert shard_key({"update_id": 1, "message": {"chat": {"id": -5}, "from": {"id": 9}}}) == -5
+    assert shard_key({"update_id": 7}) == 7
+
+
+def _stuck_worker(index, queue):
+    # Like the real workers, ignores SIGTERM and never reads its sentinel
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    time.sleep(60)
+
+
+def test_stop_workers_kills_stuck_workers():
+    supervisor = ShardSupervisor(_stuck_worker, 2)
+    supervisor.start_workers()
+    supervisor.stop_workers(timeout=0.5)
+    assert [process.exitcode for process in supervisor._processes] == [-signal.SIGKILL] * 2
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+
+from database import Database
+from warns import KeyLayout, WarningStore
+
+DAY_MS = 86400 * 1000
+KEY = "warns:-100:42"
+NOW = 1_700_000_000_000
+
+
+async def warn(storage, member, now, decay=DAY_MS, max_warnings=3):
+    return tuple(await storage.run_script(
+        "warn", keys=(KEY,), args=(max_warnings, now, decay, member)
+    ))
+
+
+async def count(storage, now, decay=DAY_MS):
+    return await storage.run_script("warn_count", keys=(KEY,), args=(now, decay))
+
+
+def test_decayed_warnings_do_not_count_towards_escalation(with_storage):
+    async def scenario(storage):
+        assert await warn(storage, "a", NOW) == (1, 0)
+        assert await warn(storage, "b", NOW + 1000) == (2, 0)
+        # "a" decayed exactly at the boundary, "b" is still live
+        assert await warn(storage, "c", NOW + DAY_MS) == (2, 0)
+        assert await storage.client.zcard(KEY) == 2
+    with_storage(scenario)
+
+
+def test_count_and_warn_agree_on_the_decay_boundary(with_storage):
+    async def scenario(storage):
+        await warn(storage, "a", NOW)
+        assert await count(storage, NOW + DAY_MS - 1) == 1
+        assert await count(storage, NOW + DAY_MS) == 0
+    with_storage(scenario)
+
+
+def test_key_expires_with_the_newest_warning(with_storage):
+    async def scenario(storage):
+        await warn(storage, "a", NOW)
+        assert 0 < await storage.client.pttl(KEY) <= DAY_MS
+    with_storage(scenario)
+
+
+def test_legacy_counter_starts_decaying_on_conversion(with_storage):
+    async def scenario(storage):
+        await storage.client.set(KEY, 1)
+        await warn(storage, "a", NOW)
+        assert await count(storage, NOW + DAY_MS - 1) == 2
+        assert await count(storage, NOW + DAY_MS) == 0
+    with_storage(scenario)
+
+
+def test_restore_keeps_newer_warnings(with_storage):
+    async def scenario(storage):
+        # The key expires at warned_at + decay, so restore relative to the real clock
+        now = int(time.time() * 1000)
+        assert await storage.run_script("warn_restore", keys=(KEY,), args=(2, now, DAY_MS)) == 1
+        assert await count(storage, now) == 2
+        assert await storage.run_script("warn_restore", keys=(KEY,), args=(1, now, DAY_MS)) == 0
+        assert await count(storage, now) == 2
+    with_storage(scenario)
+
+
+def test_rebuild_skips_decayed_rows(with_storage):
+    async def scenario(storage):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "bot.db"))
+            await db.open()
+            try:
+                old = WarningStore(storage, db, 3, decay=86400, flush_interval=60)
+                await old.warn(-100, 1)
+                await old.warn(-100, 2)
+                await old.flush()
+                await db.execute("UPDATE chat_warnings SET warned_at = warned_at - 2 * 86400 "
+                                 "WHERE user_id = 2")
+                await storage.client.flushdb()
+
+                store = WarningStore(storage, db, 3, decay=86400, flush_interval=60)
+                await store.start()
+                assert await store.count(-100, 1) == 1
+                assert await store.count(-100, 2) == 0
+                assert not await storage.client.exists(KeyLayout.key(-100, 2))
+                await store.close()
+            finally:
+                await db.close()
+    with_storage(scenario)
@@ -0,0 +1,86 @@
+import time
+
+from warns import HashLayout, KeyLayout, WarningStore, migrate_keys_to_hash
+
+DAY = 86400
+CHAT = -100
+HASH = HashLayout.key(CHAT)
+NOW = 1_700_000_000
+
+
+async def warn(storage, user_id, now=NOW, decay=DAY, max_warnings=3):
+    return tuple(await storage.run_script(
+        "warn_hash", keys=(HASH,), args=(user_id, max_warnings, now, decay)
+    ))
+
+
+async def count(storage, user_id, now=NOW, decay=DAY):
+    return await storage.run_script("warn_hash_count", keys=(HASH,), args=(user_id, now, decay))
+
+
+def test_warnings_accumulate_per_user_then_escalate(with_storage):
+    async def scenario(storage):
+        assert await warn(storage, 1) == (1, 0)
+        assert await warn(storage, 2) == (1, 0)
+        assert await warn(storage, 1, NOW + 1) == (2, 0)
+        assert await warn(storage, 1, NOW + 2) == (3, 1)
+        assert not await storage.client.hexists(HASH, 1)
+        assert await count(storage, 2) == 1
+    with_storage(scenario)
+
+
+def test_decay_trims_timestamps_and_counts(with_storage):
+    async def scenario(storage):
+        await warn(storage, 1)
+        await warn(storage, 1, NOW + 10)
+        assert await count(storage, 1, NOW + DAY - 1) == 2
+        assert await count(storage, 1, NOW + DAY) == 1
+        # The next warning rewrites the field without the decayed timestamp
+        assert await warn(storage, 1, NOW + DAY) == (2, 0)
+        assert await storage.client.hget(HASH, 1) == f"{NOW + 10},{NOW + DAY}".encode()
+        assert 0 < await storage.client.ttl(HASH) <= DAY
+    with_storage(scenario)
+
+
+def test_sampled_cleanup_drops_fully_decayed_users(with_storage):
+    async def scenario(storage):
+        for user_id in range(1, 6):
+            await warn(storage, user_id)
+        await warn(storage, 99, NOW + DAY)
+        # At most 8 fields are sampled, so a chat this small is cleaned fully
+        assert await storage.client.hkeys(HASH) == [b"99"]
+    with_storage(scenario)
+
+
+def test_restore_keeps_existing_users(with_storage):
+    async def scenario(storage):
+        await warn(storage, 1)
+        restore = storage.run_script
+        assert await restore("warn_hash_restore", keys=(HASH,), args=(1, 2, NOW, DAY, NOW)) == 0
+        assert await restore("warn_hash_restore", keys=(HASH,), args=(2, 2, NOW, DAY, NOW)) == 1
+        assert await count(storage, 1) == 1
+        assert await count(storage, 2) == 2
+    with_storage(scenario)
+
+
+def test_migration_converts_and_merges(with_storage):
+    async def scenario(storage):
+        now = int(time.time())
+        keys = KeyLayout(storage, DAY)
+        await keys.warn(CHAT, 1, 3, now - 10)
+        await keys.warn(CHAT, 1, 3, now - 5)
+        await keys.warn(-200, 2, 3, now)
+        await storage.client.set(KeyLayout.key(CHAT, 3), 1)  # legacy counter
+        await storage.client.set(WarningStore.LOADED_KEY, 1)
+        await storage.client.hset(HASH, 1, str(now - 20))
+
+        assert await migrate_keys_to_hash(storage, decay=DAY) == 3
+        assert await storage.client.keys("warns:*") == [WarningStore.LOADED_KEY.encode()]
+
+        store = WarningStore(storage, None, 5, decay=DAY, layout="hash")
+        assert await store.warned(CHAT) == {1: 3, 3: 1}
+        assert await store.warned(-200) == {2: 1}
+        assert await storage.client.ttl(HASH) > 0
+        # Nothing is left to move on a second run
+        assert await migrate_keys_to_hash(storage, decay=DAY) == 0
+    with_storage(scenario)
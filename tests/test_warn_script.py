@@ -0,0 +1,53 @@
+KEY = "warns:-100:42"
+NOW = 1_700_000_000_000
+
+
+async def warn(storage, member, now=NOW, decay=0, max_warnings=3):
+    count, escalate = await storage.run_script(
+        "warn", keys=(KEY,), args=(max_warnings, now, decay, member)
+    )
+    return count, escalate
+
+
+def test_warnings_accumulate_then_escalate(with_storage):
+    async def scenario(storage):
+        assert await warn(storage, member="a") == (1, 0)
+        assert await warn(storage, member="b") == (2, 0)
+        assert await warn(storage, member="c") == (3, 1)
+        # Escalation clears the user's warnings
+        assert not await storage.client.exists(KEY)
+        assert await warn(storage, member="d") == (1, 0)
+    with_storage(scenario)
+
+
+def test_legacy_counter_is_converted(with_storage):
+    async def scenario(storage):
+        await storage.client.set(KEY, 1)
+        assert await warn(storage, member="a") == (2, 0)
+        assert (await storage.client.type(KEY)) == b"zset"
+        assert await storage.client.zcard(KEY) == 2
+    with_storage(scenario)
+
+
+def test_legacy_counter_at_limit_escalates(with_storage):
+    async def scenario(storage):
+        await storage.client.set(KEY, 2)
+        assert await warn(storage, member="a") == (3, 1)
+    with_storage(scenario)
+
+
+def test_count_reads_legacy_and_sorted_set(with_storage):
+    async def scenario(storage):
+        assert await storage.run_script("warn_count", keys=(KEY,), args=(NOW, 0)) == 0
+        await storage.client.set(KEY, 2)
+        assert await storage.run_script("warn_count", keys=(KEY,), args=(NOW, 0)) == 2
+        await warn(storage, max_warnings=5, member="a")
+        assert await storage.run_script("warn_count", keys=(KEY,), args=(NOW, 0)) == 3
+    with_storage(scenario)
+
+
+def test_script_reloaded_after_flush(with_storage):
+    async def scenario(storage):
+        await storage.client.script_flush()
+        assert await warn(storage, member="a") == (1, 0)
+    with_storage(scenario)
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+from welcome import WelcomeCoalescer
+
+
+def render(mentions, **kwargs):
+    coalescer = WelcomeCoalescer(send=None, delete=None, **kwargs)
+    return list(coalescer.render(mentions))
+
+
+def test_single_message_for_few_members():
+    assert render(["<a>A</a>", "<a>B</a>"]) == ["👋 Welcome <a>A</a>, <a>B</a>!\nPlease read the /rules."]
+
+
+def test_split_by_mention_count():
+    texts = render([f"@user{i}" for i in range(45)], max_mentions=20)
+    assert [text.count("@user") for text in texts] == [20, 20, 5]
+
+
+def test_split_by_length_keeps_every_mention():
+    mentions = [f"<a href='tg://user?id={i}'>{'x' * 40}</a>" for i in range(60)]
+    texts = render(mentions, max_mentions=100, max_length=1024)
+    assert all(len(text) <= 1024 for text in texts)
+    assert sum(text.count("<a ") for text in texts) == 60
+    assert len(texts) > 1
+
+
+def test_no_mentions_no_message():
+    assert render([]) == []
+
+
+def test_discard_drops_pending_welcomes():
+    sent = []
+
+    async def send(chat_id, text):
+        sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(sent))
+
+    async def main():
+        coalescer = WelcomeCoalescer(send=send, delete=None, window=0.05)
+        coalescer.add(1, ["@raider"])
+        coalescer.add(2, ["@member"])
+        coalescer.discard(1)
+        await asyncio.sleep(0.1)
+        await coalescer.close()
+
+    asyncio.run(main())
+    assert [chat_id for chat_id, _ in sent] == [2]
@@ -0,0 +1,66 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+from database import Database
+from users import UserUpsertPipeline
+
+
+class FlakyDatabase(Database):
+    """Fails the first ``failures`` write transactions like a busy database"""
+
+    def __init__(self, path, failures=1):
+        super().__init__(path, readers=1)
+        self.failures = failures
+
+    async def transaction(self, fn):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return await super().transaction(fn)
+
+
+def user(user_id, name):
+    return SimpleNamespace(id=user_id, username=name, first_name=name, last_name=None)
+
+
+def test_failed_flush_is_retried(tmp_path):
+    async def main():
+        db = FlakyDatabase(str(tmp_path / "bot.db"))
+        await db.open()
+        users = UserUpsertPipeline(db)
+        try:
+            users.track(user(1, "alice"))
+            users.track(user(2, "bob"))
+            try:
+                await users.flush()
+            except sqlite3.OperationalError:
+                pass
+            else:
+                raise AssertionError("the first flush should fail")
+            users.track(user(3, "carol"))
+
+            await users.flush()
+            rows = await db.fetchall("SELECT user_id FROM users ORDER BY user_id")
+            assert [row["user_id"] for row in rows] == [1, 2, 3]
+            assert users.written == 3
+        finally:
+            await db.close()
+    asyncio.run(main())
+
+
+def test_failed_flush_is_written_on_close(tmp_path):
+    async def main():
+        db = FlakyDatabase(str(tmp_path / "bot.db"))
+        await db.open()
+        users = UserUpsertPipeline(db)
+        users.track(user(1, "alice"))
+        try:
+            await users.flush()
+        except sqlite3.OperationalError:
+            pass
+        await users.close()
+        rows = await db.fetchall("SELECT user_id FROM users")
+        await db.close()
+        assert [row["user_id"] for row in rows] == [1]
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Move warnings from the per-user ``warns:`` keys to per-chat hashes
+
+Usage: python tools/migrate_warnings.py
+
+Uses REDIS_URL and WARN_DECAY_DAYS from the environment like the bot does.
+Stop the bot first, run this, then start it again with WARN_LAYOUT=hash.
+Running it twice is harmless.
+"""
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from config import Config  # noqa: E402
+from storage import RedisStorage  # noqa: E402
+from warns import migrate_keys_to_hash  # noqa: E402
+
+
+async def main():
+    storage = RedisStorage(Config.REDIS_URL)
+    await storage.open()
+    try:
+        moved = await migrate_keys_to_hash(storage, decay=Config.WARN_DECAY_DAYS * 86400)
+    finally:
+        await storage.close()
+    print(f"migrated {moved} warning keys")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from database import WriteBehindBuffer
+
+UPSERT_USER_SQL = (
+    "INSERT INTO users (user_id, username, first_name, last_name, join_date) "
+    "VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (user_id) DO UPDATE SET "
+    "username = excluded.username, first_name = excluded.first_name, "
+    "last_name = excluded.last_name, join_date = COALESCE(join_date, excluded.join_date)"
+)
+
+
+class UserUpsertPipeline(WriteBehindBuffer):
+    """Keeps the users table current from update senders, writing only changes
+
+    Each sender's name fields are fingerprinted and compared with the last
+    written fingerprint; unchanged users are skipped in memory and changed
+    ones are upserted in batches. ``known_users`` bounds the fingerprint
+    cache; evicted users just cost one redundant write when seen again.
+    """
+
+    def __init__(self, db, flush_interval=5.0, flush_max=1000, known_users=100000):
+        super().__init__(flush_interval, flush_max)
+        self.db = db
+        self.known_users = known_users
+        self._known = OrderedDict()  # user_id -> fingerprint of the stored row
+        self._dirty = {}  # user_id -> (fingerprint, row)
+        self.seen = 0
+        self.skipped = 0
+        self.written = 0
+
+    @property
+    def counters(self):
+        return {"seen": self.seen, "skipped": self.skipped, "written": self.written}
+
+    def track(self, user):
+        """Queue ``user`` (a telegram.User) for upsert if their names changed"""
+        self.seen += 1
+        fingerprint = hash((user.username, user.first_name, user.last_name))
+        if self._known.get(user.id) == fingerprint:
+            self._known.move_to_end(user.id)
+            self.skipped += 1
+            return
+        pending = self._dirty.get(user.id)
+        if pending is not None and pending[0] == fingerprint:
+            self.skipped += 1
+            return
+        self._dirty[user.id] = (fingerprint, (
+            user.id,
+            user.username,
+            user.first_name,
+            user.last_name,
+            datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        ))
+        self._updated()
+
+    async def _write(self):
+        dirty, self._dirty = self._dirty, {}
+        rows = [row for _, row in dirty.values()]
+        try:
+            await self.db.transaction(lambda conn: conn.executemany(UPSERT_USER_SQL, rows))
+        except BaseException:
+            # Newer changes queued meanwhile win over the failed batch
+            for user_id, entry in dirty.items():
+                self._dirty.setdefault(user_id, entry)
+            raise
+        self.written += len(rows)
+        for user_id, (fingerprint, _) in dirty.items():
+            self._known[user_id] = fingerprint
+            self._known.move_to_end(user_id)
+        while len(self._known) > self.known_users:
+            self._known.popitem(last=False)
@@ -0,0 +1,243 @@
+import logging
+import os
+import time
+from database import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+SAVE_COUNT_SQL = (
+    "INSERT INTO chat_warnings (chat_id, user_id, count, warned_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (chat_id, user_id) DO UPDATE SET "
+    "count = excluded.count, warned_at = excluded.warned_at"
+)
+# users.warnings mirrors the user's total over all chats
+SAVE_TOTAL_SQL = (
+    "INSERT INTO users (user_id, warnings) "
+    "VALUES (?1, (SELECT COALESCE(SUM(count), 0) FROM chat_warnings WHERE user_id = ?1)) "
+    "ON CONFLICT (user_id) DO UPDATE SET warnings = excluded.warnings"
+)
+
+
+class KeyLayout:
+    """One sorted set of warning timestamps (ms) per (chat, user) key"""
+
+    def __init__(self, storage, decay):
+        self.storage = storage
+        self.decay_ms = int(decay * 1000)
+
+    @staticmethod
+    def key(chat_id, user_id):
+        return f"warns:{chat_id}:{user_id}"
+
+    async def warn(self, chat_id, user_id, max_warnings, now):
+        now_ms = int(now * 1000)
+        return await self.storage.run_script(
+            "warn",
+            keys=(self.key(chat_id, user_id),),
+            args=(max_warnings, now_ms, self.decay_ms, f"{now_ms}:{os.urandom(4).hex()}"),
+        )
+
+    async def count(self, chat_id, user_id, now):
+        return await self.storage.run_script(
+            "warn_count", keys=(self.key(chat_id, user_id),), args=(int(now * 1000), self.decay_ms)
+        )
+
+    async def restore(self, chat_id, user_id, count, warned_at, now):
+        return await self.storage.run_script(
+            "warn_restore",
+            keys=(self.key(chat_id, user_id),),
+            args=(count, warned_at * 1000, self.decay_ms),
+        )
+
+    async def warned(self, chat_id, now):
+        prefix = self.key(chat_id, "")
+        users = {}
+        async for key in self.storage.client.scan_iter(match=prefix + "*", count=1000):
+            user_id = int(key.decode()[len(prefix):])
+            count = await self.count(chat_id, user_id, now)
+            if count:
+                users[user_id] = count
+        return users
+
+
+class HashLayout:
+    """One hash per chat; field = user id, value = comma separated timestamps (s)
+
+    Small chats stay in Redis's listpack encoding, which costs a few bytes per
+    user instead of a full key each, and listing a chat is a single HGETALL.
+    """
+
+    def __init__(self, storage, decay):
+        self.storage = storage
+        self.decay = int(decay)
+
+    @staticmethod
+    def key(chat_id):
+        return f"warnings:{chat_id}"
+
+    async def warn(self, chat_id, user_id, max_warnings, now):
+        return await self.storage.run_script(
+            "warn_hash", keys=(self.key(chat_id),), args=(user_id, max_warnings, int(now), self.decay)
+        )
+
+    async def count(self, chat_id, user_id, now):
+        return await self.storage.run_script(
+            "warn_hash_count", keys=(self.key(chat_id),), args=(user_id, int(now), self.decay)
+        )
+
+    async def restore(self, chat_id, user_id, count, warned_at, now):
+        return await self.storage.run_script(
+            "warn_hash_restore",
+            keys=(self.key(chat_id),),
+            args=(user_id, count, warned_at, self.decay, int(now)),
+        )
+
+    async def warned(self, chat_id, now):
+        users = {}
+        for field, value in (await self.storage.client.hgetall(self.key(chat_id))).items():
+            stamps = [int(ts) for ts in value.split(b",")]
+            count = sum(1 for ts in stamps if not self.decay or ts > now - self.decay)
+            if count:
+                users[int(field)] = count
+        return users
+
+
+LAYOUTS = {"keys": KeyLayout, "hash": HashLayout}
+
+
+class WarningStore(WriteBehindBuffer):
+    """Warning counts with Redis as the hot tier and SQLite as the durable one
+
+    Redis keeps the timestamp of every live warning, in the ``keys`` or the
+    more compact ``hash`` layout. With a ``decay`` (seconds) each warning
+    expires on its own after that long and keys carry matching TTLs, so Redis
+    only holds active offenders.
+
+    The warn path only touches Redis. Changed counts are checkpointed to
+    ``chat_warnings`` (and the ``users.warnings`` totals) in the background,
+    and a Redis instance that lost its data is refilled from SQLite on start.
+    Restored warnings are dated to the latest checkpointed warning.
+    """
+
+    LOADED_KEY = "warns:loaded"
+
+    def __init__(self, storage, db, max_warnings, decay=0, layout="keys",
+                 flush_interval=1.0, flush_max=500):
+        super().__init__(flush_interval, flush_max)
+        self.storage = storage
+        self.db = db
+        self.max_warnings = max_warnings
+        self.decay = decay
+        self.layout = LAYOUTS[layout](storage, decay)
+        self._dirty = {}  # (chat_id, user_id) -> (count, warned_at) to checkpoint
+
+    async def start(self):
+        await self._rebuild()
+        await super().start()
+
+    async def _rebuild(self):
+        # Only the first process to claim the marker refills Redis
+        if not await self.storage.client.set(self.LOADED_KEY, 1, nx=True):
+            return
+        now = int(time.time())
+        rows = await self.db.fetchall(
+            "SELECT chat_id, user_id, count, warned_at FROM chat_warnings WHERE count > 0"
+        )
+        restored = 0
+        for row in rows:
+            warned_at = row["warned_at"] or now
+            if self.decay and now - warned_at >= self.decay:
+                continue
+            # Keeps any warning issued since Redis came back
+            restored += await self.layout.restore(
+                row["chat_id"], row["user_id"], row["count"], warned_at, now
+            )
+        logger.info("Restored %d warning counters from SQLite", restored)
+
+    async def warn(self, chat_id, user_id):
+        """Add a warning; returns (count, escalate). Counts reset on escalation"""
+        now = time.time()
+        count, escalate = await self.layout.warn(chat_id, user_id, self.max_warnings, now)
+        count, escalate = int(count), bool(escalate)
+        self._dirty[(chat_id, user_id)] = (0 if escalate else count, int(now))
+        self._updated()
+        return count, escalate
+
+    async def count(self, chat_id, user_id):
+        """Live (not yet decayed) warnings of a user in a chat"""
+        return int(await self.layout.count(chat_id, user_id, time.time()) or 0)
+
+    async def warned(self, chat_id):
+        """{user_id: live warnings} for every warned user of a chat"""
+        return await self.layout.warned(chat_id, time.time())
+
+    async def _write(self):
+        dirty, self._dirty = self._dirty, {}
+        counts = [
+            (chat_id, user_id, count, warned_at)
+            for (chat_id, user_id), (count, warned_at) in dirty.items()
+        ]
+        totals = [(user_id,) for user_id in {user_id for _, user_id in dirty}]
+
+        def checkpoint(conn):
+            conn.executemany(SAVE_COUNT_SQL, counts)
+            conn.executemany(SAVE_TOTAL_SQL, totals)
+
+        try:
+            await self.db.transaction(checkpoint)
+        except BaseException:
+            # Counts are absolute, so newer values queued meanwhile win
+            for key, entry in dirty.items():
+                self._dirty.setdefault(key, entry)
+            raise
+
+
+async def migrate_keys_to_hash(storage, decay=0, batch_size=500):
+    """Move every ``warns:{chat}:{user}`` key into the per-chat hash layout
+
+    Legacy counters without timestamps are dated to now, decayed warnings are
+    dropped and users already present in a chat hash get both sets merged.
+    Safe to re-run. Returns the number of keys moved.
+    """
+    client = storage.client
+    now = int(time.time())
+    moved = 0
+    batch = []
+
+    async def flush():
+        nonlocal moved
+        async with client.pipeline(transaction=False) as pipe:
+            for _, chat_id, user_id, _ in batch:
+                pipe.hget(HashLayout.key(chat_id), user_id)
+                pipe.ttl(HashLayout.key(chat_id))
+            current = await pipe.execute()
+        async with client.pipeline(transaction=False) as pipe:
+            for i, (key, chat_id, user_id, stamps) in enumerate(batch):
+                existing, ttl = current[2 * i], current[2 * i + 1]
+                if existing:
+                    stamps = sorted(stamps + [int(ts) for ts in existing.split(b",")])
+                if stamps:
+                    pipe.hset(HashLayout.key(chat_id), user_id, ",".join(map(str, stamps)))
+                    if decay and ttl < stamps[-1] + decay - now:
+                        pipe.expire(HashLayout.key(chat_id), stamps[-1] + decay - now)
+                pipe.delete(key)
+            await pipe.execute()
+        moved += len(batch)
+        batch.clear()
+
+    async for key in client.scan_iter(match="warns:*:*", count=1000):
+        _, chat_id, user_id = key.decode().split(":")
+        kind = (await client.type(key)).decode()
+        if kind == "string":
+            stamps = [now] * int(await client.get(key) or 0)
+        elif kind == "zset":
+            stamps = [int(score // 1000) for _, score in await client.zrange(key, 0, -1, withscores=True)]
+        else:
+            continue
+        stamps = sorted(ts for ts in stamps if not decay or ts > now - decay)
+        batch.append((key, int(chat_id), int(user_id), stamps))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return moved
@@ -0,0 +1,63 @@
+import hmac
+import logging
+import orjson
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """aiohttp server receiving Telegram webhook calls
+
+    Each valid request body is decoded and passed to ``sink`` as a plain dict;
+    the sink decides how the update is dispatched. Requests without the
+    ``secret_token`` registered with ``setWebhook`` are rejected.
+    """
+
+    def __init__(self, sink, secret_token, listen="0.0.0.0", port=8443, path="/webhook"):
+        if not secret_token:
+            raise ValueError("A webhook secret token is required")
+        self.sink = sink
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self._runner = None
+
+    def build_app(self):
+        app = web.Application()
+        app.router.add_post(self.path, self._handle_update)
+        app.router.add_get("/healthz", self._handle_health)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+        logger.info("Webhook server listening on %s:%d%s", self.listen, self.port, self.path)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_update(self, request):
+        if not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self.secret_token
+        ):
+            return web.Response(status=403)
+
+        try:
+            data = orjson.loads(await request.read())
+        except orjson.JSONDecodeError:
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            return web.Response(status=400)
+
+        await self.sink(data)
+        return web.Response()
+
+    async def _handle_health(self, request):
+        return web.Response(text="ok")
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+MAX_CAPTION_LENGTH = 1024
+
+
+class WelcomeCoalescer:
+    """Debounces joins per chat into one welcome message
+
+    Members joining within ``window`` seconds of the first pending join are
+    greeted together. ``send(chat_id, text)`` delivers a welcome and returns
+    the sent message; ``delete(chat_id, message_id)`` removes the previous
+    welcome when ``replace_previous`` is set.
+    """
+
+    def __init__(self, send, delete, window=5.0, max_mentions=20, replace_previous=False,
+                 max_length=MAX_MESSAGE_LENGTH):
+        self.send = send
+        self.delete = delete
+        self.window = window
+        self.max_mentions = max_mentions
+        self.max_length = max_length
+        self.replace_previous = replace_previous
+        self._pending = {}  # chat_id -> list of mention HTML snippets
+        self._timers = {}
+        self._last_welcome = {}  # chat_id -> message ids of the last welcome
+
+    def add(self, chat_id, mentions):
+        pending = self._pending.setdefault(chat_id, [])
+        pending.extend(mentions)
+        if chat_id not in self._timers:
+            self._timers[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+
+    def discard(self, chat_id):
+        """Drop the pending welcomes of a chat without sending them"""
+        timer = self._timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._pending.pop(chat_id, None)
+
+    async def _flush_later(self, chat_id):
+        await asyncio.sleep(self.window)
+        del self._timers[chat_id]
+        try:
+            await self.flush(chat_id)
+        except Exception:
+            logger.exception("Failed to send welcome in %s", chat_id)
+
+    async def flush(self, chat_id):
+        mentions = self._pending.pop(chat_id, None)
+        if not mentions:
+            return
+        if self.replace_previous:
+            for message_id in self._last_welcome.pop(chat_id, ()):
+                try:
+                    await self.delete(chat_id, message_id)
+                except Exception as exc:
+                    logger.debug("Could not delete old welcome in %s: %s", chat_id, exc)
+
+        sent = []
+        for text in self.render(mentions):
+            message = await self.send(chat_id, text)
+            sent.append(message.message_id)
+        self._last_welcome[chat_id] = sent
+
+    def render(self, mentions):
+        """Split mentions into welcome texts within the mention and length limits"""
+        head, tail = "👋 Welcome ", "!\nPlease read the /rules."
+        budget = self.max_length - len(head) - len(tail)
+        chunk, length = [], 0
+        for mention in mentions:
+            extra = len(mention) + (2 if chunk else 0)
+            if chunk and (len(chunk) == self.max_mentions or length + extra > budget):
+                yield head + ", ".join(chunk) + tail
+                chunk, length = [], 0
+                extra = len(mention)
+            chunk.append(mention)
+            length += extra
+        if chunk:
+            yield head + ", ".join(chunk) + tail
+
+    async def close(self):
+        """Send every pending welcome now"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for chat_id in list(self._pending):
+            try:
+                await self.flush(chat_id)
+            except Exception:
+                logger.exception("Failed to send welcome in %s", chat_id)